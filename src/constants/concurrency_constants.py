@@ -0,0 +1,28 @@
+from typing import Final
+
+class DefaultValues:
+    MIN_LIMIT: Final[int] = 1
+    MAX_LIMIT: Final[int] = 64
+    INITIAL_LIMIT: Final[int] = 4
+    # Number of handler latency samples each limit update is calculated from
+    SAMPLES_WINDOW: Final[int] = 20
+    # Every this number of windows, the limit is lowered to re-measure the no load latency
+    PROBE_WINDOWS: Final[int] = 100
+    # The ratio the limit is lowered by, when probing the no load latency
+    PROBE_RATIO: Final[float] = 0.5
+    # How much the latency may exceed the no load latency before the limit shrinks (absorbs the latency noise)
+    LATENCY_TOLERANCE: Final[float] = 1.1
+    # Weight of a new limit estimation in the (smoothed) current limit
+    SMOOTHING: Final[float] = 0.2
+    CPU_UTILIZATION_TARGET: Final[float] = 0.9
+    # Cores the handler threads can use together, 1 for GIL bound (pure Python) handlers
+    CPU_CORES: Final[int] = 1
+    BACKOFF_RATIO: Final[float] = 0.9
+    # Messages prefetched per handler thread, so no handler thread waits for the broker
+    PREFETCH_PER_WORKER: Final[int] = 2
+
+class MetricNames:
+    LIMIT: Final[str] = 'rabbitmq.consumer.concurrency.limit'
+    IN_FLIGHT: Final[str] = 'rabbitmq.consumer.concurrency.in_flight'
+    LATENCY_MS: Final[str] = 'rabbitmq.consumer.concurrency.latency_ms'
+    CPU_UTILIZATION: Final[str] = 'rabbitmq.consumer.concurrency.cpu_utilization'
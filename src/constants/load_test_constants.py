@@ -0,0 +1,31 @@
+from typing import Final
+
+class DefaultValues:
+    QUEUE_NAME: Final[str] = 'load_test_docx_queue'
+    BUCKET_NAME: Final[str] = 'load-test-docx'
+    MOTO_HOST: Final[str] = '127.0.0.1'
+    MOTO_PORT: Final[int] = 5000
+    S3_ACCESS_KEY_ID: Final[str] = 'testing'
+    S3_SECRET_ACCESS_KEY: Final[str] = 'testing'
+    RATE: Final[float] = 10.0
+    DURATION_SECONDS: Final[float] = 60.0
+    SAMPLE_INTERVAL_SECONDS: Final[float] = 1.0
+    DRAIN_TIMEOUT_SECONDS: Final[float] = 30.0
+    STARTUP_TIMEOUT_SECONDS: Final[float] = 30.0
+    # How often the worker process publishes its broker state (queue depth, unacked, concurrency limit)
+    STATE_INTERVAL_SECONDS: Final[float] = 0.05
+    DOCUMENTS: Final[int] = 20
+    PARAGRAPHS: Final[int] = 200
+    WORDS_PER_PARAGRAPH: Final[int] = 12
+    STYLES_NAMES: Final[list[str]] = ['heading 1', 'heading 2', 'quote']
+
+class Handlers:
+    # The extractor on the downloaded docx (the parse cost is part of the measurement)
+    EXTRACT: Final[str] = 'extract'
+    # The service's queue handler, after the docx download
+    SERVICE: Final[str] = 'service'
+
+class Headers:
+    PUBLISHED_AT: Final[str] = 'published_at'
+
+LATENCY_PERCENTILES: Final[list[int]] = [50, 90, 95, 99]
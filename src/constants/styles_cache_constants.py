@@ -0,0 +1,22 @@
+import os
+import tempfile
+from typing import Final
+
+class EnvKeys:
+    STYLES_CACHE_DIR: Final[str] = 'STYLES_CACHE_DIR'
+    STYLES_CACHE_MAX_ENTRIES: Final[str] = 'STYLES_CACHE_MAX_ENTRIES'
+
+class DefaultValues:
+    # /dev/shm is memory backed (tmpfs), so all the worker processes share the cache without touching the disk
+    STYLES_CACHE_DIR: Final[str] = os.path.join(
+        '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'text-extractor-styles'
+    )
+    STYLES_CACHE_MAX_ENTRIES: Final[int] = 512
+    # Minimal seconds between touching (LRU) a shared entry that is served from the process memory
+    SHARED_TOUCH_INTERVAL_SECONDS: Final[float] = 10.0
+    # Entries are readable by workers running as other users
+    SHARED_ENTRY_MODE: Final[int] = 0o644
+
+WORD_NAMESPACES: Final[dict[str, str]] = {
+    'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+}
@@ -0,0 +1,16 @@
+from typing import Final
+
+class Columns:
+    DOCUMENT: Final[str] = 'document_id'
+    STYLE: Final[str] = 'style_name'
+    TEXT: Final[str] = 'text'
+    COUNT: Final[str] = 'count'
+
+class ParquetFiles:
+    RUNS: Final[str] = 'runs.parquet'
+    FREQUENCIES: Final[str] = 'frequencies.parquet'
+
+# RE2 (pyarrow.compute) `\s` is ASCII only, the unicode separators (no-break space, em space...) are added explicitly
+WHITESPACE_PATTERN: Final[str] = r'[\s\p{Z}\x0b]+'
+# `extract_strings_by_style()` rewrites the hits text to '[text:style_id]' (`(?s)` lets the text span lines)
+DECORATED_TEXT_PATTERN: Final[str] = r'(?s)^\[(.*):[^:\]]*\]$'
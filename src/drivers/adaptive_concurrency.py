@@ -0,0 +1,240 @@
+import queue
+import statistics
+import threading
+import time
+from typing import Callable
+
+from elasticapm.metrics.base_metrics import MetricSet
+
+from configs.apm_config import apm
+from constants.concurrency_constants import DefaultValues, MetricNames
+
+"""
+    AdaptiveConcurrency -
+    Tunes the number of concurrent queue handlers (and the channel prefetch) at runtime,
+    instead of opening a thread per message.
+
+    The limit is estimated like the "gradient" limit of Netflix's concurrency-limits:
+    after every window of handler latency samples, the limit is scaled by the ratio between the no load latency
+    (the minimal window latency) and the current latency, so it shrinks when more concurrency only adds latency
+    (CPU bound work), and grows by a small "queue" while the latency stays flat (I/O bound work).
+    Every few windows the limit is lowered (probed) and the no load latency is re-measured, so the limit can converge
+    down, and the baseline follows real changes of the work (e.g. bigger documents).
+    On top of it, the limit is decreased multiplicatively while the CPU utilization is above the target.
+
+    Limitation: the handlers are threads of a single process, so pure Python work is bound by the GIL to about one core.
+    The CPU utilization is measured against `cpu_cores` (default 1) cores, set it to the usable cores only
+    for handlers that release the GIL. One handler per core requires running a worker process per core.
+"""
+
+class AdaptiveConcurrencyLimit:
+    def __init__(
+        self,
+        min_limit: int = DefaultValues.MIN_LIMIT,
+        max_limit: int = DefaultValues.MAX_LIMIT,
+        initial_limit: int = DefaultValues.INITIAL_LIMIT,
+        samples_window: int = DefaultValues.SAMPLES_WINDOW,
+        probe_windows: int = DefaultValues.PROBE_WINDOWS,
+        probe_ratio: float = DefaultValues.PROBE_RATIO,
+        latency_tolerance: float = DefaultValues.LATENCY_TOLERANCE,
+        smoothing: float = DefaultValues.SMOOTHING,
+        cpu_utilization_target: float = DefaultValues.CPU_UTILIZATION_TARGET,
+        cpu_cores: int = DefaultValues.CPU_CORES,
+        backoff_ratio: float = DefaultValues.BACKOFF_RATIO
+    ) -> None:
+        assert 0 < min_limit <= initial_limit <= max_limit, 'Limits must satisfy 0 < min_limit <= initial_limit <= max_limit'
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.samples_window = samples_window
+        self.probe_windows = probe_windows
+        self.probe_ratio = probe_ratio
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.cpu_utilization_target = cpu_utilization_target
+        self.cpu_cores = cpu_cores
+        self.backoff_ratio = backoff_ratio
+
+        self.estimated_limit: float = float(initial_limit)
+        self.short_latency: float = None
+        self.no_load_latency: float = None
+        self.cpu_utilization: float = 0.0
+
+        self._lock = threading.Lock()
+        self._samples: list[float] = []
+        self._windows: int = 0
+        self._window_max_in_flight: int = 0
+        self._cpu_measured_at: tuple[float, float] = (time.monotonic(), time.process_time())
+
+    @property
+    def limit(self) -> int:
+        return int(self.estimated_limit)
+
+    def on_sample(self, latency: float, in_flight: int) -> int | None:
+        """
+            Records a handler latency, and updates the limit once a window of samples is full.
+
+            args:
+                - `latency: float` - The handler duration in seconds
+                - `in_flight: int` - Number of handlers running when the handler was started
+
+            returns: `int` - the new limit in case it has changed, otherwise None
+        """
+        with self._lock:
+            self._samples.append(latency)
+            self._window_max_in_flight = max(self._window_max_in_flight, in_flight)
+            if len(self._samples) < self.samples_window:
+                return None
+
+            previous_limit: int = self.limit
+            self._update(statistics.median(self._samples), self._window_max_in_flight)
+            self._samples = []
+            self._window_max_in_flight = 0
+
+            return self.limit if self.limit != previous_limit else None
+
+    def _measure_cpu_utilization(self) -> float:
+        """
+            returns: `float` - The process CPU utilization since the last measure (1.0 means `cpu_cores` cores are busy)
+        """
+        wall_time, cpu_time = time.monotonic(), time.process_time()
+        previous_wall_time, previous_cpu_time = self._cpu_measured_at
+        self._cpu_measured_at = (wall_time, cpu_time)
+
+        elapsed: float = wall_time - previous_wall_time
+        return (cpu_time - previous_cpu_time) / (elapsed * self.cpu_cores) if elapsed > 0 else 0.0
+
+    def _update(self, short_latency: float, max_in_flight: int) -> None:
+        self._windows += 1
+        self.short_latency = short_latency
+        self.cpu_utilization = self._measure_cpu_utilization()
+
+        if self.no_load_latency is None or short_latency < self.no_load_latency:
+            self.no_load_latency = short_latency
+
+        if self._windows % self.probe_windows == 0:
+            # Probing: the next window measures the no load latency again, at a lower concurrency
+            self.estimated_limit = max(float(self.min_limit), self.estimated_limit * self.probe_ratio)
+            self.no_load_latency = None
+            return
+
+        if self.cpu_utilization > self.cpu_utilization_target:
+            new_limit: float = self.estimated_limit * self.backoff_ratio
+        else:
+            gradient: float = max(0.5, min(1.0, self.latency_tolerance * self.no_load_latency / short_latency if short_latency else 1.0))
+            new_limit = self.estimated_limit * gradient
+
+            # Growing only when the current limit is actually used, otherwise there is no evidence it helps
+            if max_in_flight >= self.limit / 2:
+                new_limit += self.estimated_limit ** 0.5
+
+            new_limit = self.estimated_limit * (1 - self.smoothing) + new_limit * self.smoothing
+
+        self.estimated_limit = max(float(self.min_limit), min(float(self.max_limit), new_limit))
+
+class AdaptiveHandlerPool:
+    '''
+        A pool of queue handler threads, sized by an `AdaptiveConcurrencyLimit`.
+        The handlers should ack their messages, since the channel prefetch bounds the unacked messages.
+    '''
+    def __init__(
+        self, name: str,
+        concurrency_limit: AdaptiveConcurrencyLimit = None,
+        prefetch_per_worker: int = DefaultValues.PREFETCH_PER_WORKER
+    ) -> None:
+        self.name = name
+        self.concurrency_limit = concurrency_limit or AdaptiveConcurrencyLimit()
+        self.prefetch_per_worker = prefetch_per_worker
+        self.in_flight: int = 0
+
+        self._lock = threading.Lock()
+        self._jobs: queue.Queue = queue.Queue()
+        self._workers: int = 0
+        self._handler: Callable = None
+        self._set_prefetch: Callable[[int], None] = None
+
+        handler_pools[name] = self
+
+    @property
+    def prefetch_count(self) -> int:
+        return self.concurrency_limit.limit * self.prefetch_per_worker
+
+    def start(self, handler: Callable, set_prefetch: Callable[[int], None] = None) -> None:
+        """
+            Starting the handler threads.
+
+            args:
+                - `handler: Callable` - The queue callback, called with the delivered message arguments
+                - `set_prefetch: Callable[[int], None]` - Called with the new prefetch count whenever the limit changes
+        """
+        self._handler = handler
+        self._set_prefetch = set_prefetch
+        self._ensure_workers()
+
+    def submit(self, *args) -> None:
+        """
+            Queues a delivered message to the handler threads (used as the `basic_consume` callback)
+        """
+        self._jobs.put(args)
+
+    def stop(self) -> None:
+        with self._lock:
+            for _ in range(self._workers):
+                self._jobs.put(None)
+
+    def _ensure_workers(self) -> None:
+        with self._lock:
+            while self._workers < self.concurrency_limit.limit:
+                self._workers += 1
+                threading.Thread(
+                    name=f'rabbitmq_queue_handler:{self.name}:{self._workers}',
+                    target=self._worker_loop, daemon=True
+                ).start()
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._lock:
+                # Shrinking the pool, by letting the extra workers exit
+                if self._workers > self.concurrency_limit.limit:
+                    self._workers -= 1
+                    return
+
+            args: tuple | None = self._jobs.get()
+            if args is None:
+                return
+
+            with self._lock:
+                self.in_flight += 1
+                in_flight: int = self.in_flight
+
+            started_at: float = time.perf_counter()
+            try:
+                self._handler(*args)
+            except Exception as ex:
+                print(f'Handler of {self.name} failed:', ex)
+            finally:
+                latency: float = time.perf_counter() - started_at
+                with self._lock:
+                    self.in_flight -= 1
+
+            new_limit: int | None = self.concurrency_limit.on_sample(latency, in_flight)
+            if new_limit is not None:
+                self._ensure_workers()
+                if self._set_prefetch is not None:
+                    self._set_prefetch(self.prefetch_count)
+
+''' Format of this dictionary like this: { pool_name: AdaptiveHandlerPool } '''
+handler_pools: dict[str, AdaptiveHandlerPool] = {}
+
+class ConcurrencyMetricSet(MetricSet):
+    def before_collect(self) -> None:
+        for name, pool in handler_pools.items():
+            concurrency_limit: AdaptiveConcurrencyLimit = pool.concurrency_limit
+            self.gauge(MetricNames.LIMIT, pool=name).val = concurrency_limit.limit
+            self.gauge(MetricNames.IN_FLIGHT, pool=name).val = pool.in_flight
+            self.gauge(MetricNames.CPU_UTILIZATION, pool=name).val = concurrency_limit.cpu_utilization
+            if concurrency_limit.short_latency is not None:
+                self.gauge(MetricNames.LATENCY_MS, pool=name).val = concurrency_limit.short_latency * 1000
+
+# Reporting the pools state to the APM server with the rest of the metrics
+apm.metrics.register('drivers.adaptive_concurrency.ConcurrencyMetricSet')
@@ -1,3 +1,4 @@
+import functools
 import os
 import threading
 from typing import Any, Callable
@@ -13,6 +14,7 @@ from pika.credentials import ExternalCredentials, PlainCredentials
 from configs.apm_config import trace_function
 from constants.apm_constants import SpanTypes
 from constants.rabbit_constants import EnvKeys
+from drivers.adaptive_concurrency import AdaptiveHandlerPool
 
 # from dotenv import load_dotenv
 # load_dotenv() # Take environment variables from .env.
@@ -24,14 +26,17 @@ from constants.rabbit_constants import EnvKeys
 
 class RabbitQueue:
     '''
-        Callback can be none, because it can be used just for publishing data
+        Callback can be none, because it can be used just for publishing data.
+        In case `concurrency` is set, the callback runs on its adaptive pool (instead of a thread per message)
+        on its own channel, whose prefetch follows the pool's limit, so the callback must ack the messages
     '''
     def __init__(
         self, 
         callback: Callable[[Channel, Basic.Deliver, BasicProperties, Any], None] = None,
         auto_ack: bool = False, exclusive: bool = False,
         consumer_tag: str = None, arguments: dict[str, dict] = {}, 
-        exchange_name: str = '', is_new_channel: bool = False
+        exchange_name: str = '', is_new_channel: bool = False,
+        concurrency: AdaptiveHandlerPool = None
     ) -> None:        
         self.callback = callback
         self.auto_ack = auto_ack
@@ -40,6 +45,7 @@ class RabbitQueue:
         self.arguments = arguments
         self.exchange_name = exchange_name
         self.is_new_channel = is_new_channel
+        self.concurrency = concurrency
 
 class RabbitDriver:
     connection: SelectConnection = None
@@ -57,15 +63,21 @@ class RabbitDriver:
         host: str = None,
         port: int = None,
         virtual_host: str = '/',
-        credentials: PlainCredentials | ExternalCredentials = None
+        credentials: PlainCredentials | ExternalCredentials = None,
+        connection_factory: Callable[..., SelectConnection] = None
     ) -> None:
+        '''
+            `connection_factory` creates the connection (default: `pika.SelectConnection`),
+            it can be replaced by a stand-in with the same interface (e.g. for load tests)
+        '''
         RabbitDriver.queues_configurations = queues_configurations
-        RabbitDriver.__initialize_connection(host, port, virtual_host, credentials)
+        RabbitDriver.__initialize_connection(host, port, virtual_host, credentials, connection_factory)
 
     @staticmethod
     def __initialize_connection(
         host: str = None, port: int = None, virtual_host: str = '/',
-        credentials: PlainCredentials | ExternalCredentials = None
+        credentials: PlainCredentials | ExternalCredentials = None,
+        connection_factory: Callable[..., SelectConnection] = None
     ) -> None:
         print('__initialize_connection() executing')
 
@@ -81,7 +93,10 @@ class RabbitDriver:
             port = int(os.getenv(EnvKeys.RABBIT_PORT))
             parameters.port = port
 
-        RabbitDriver.connection = pika.SelectConnection(
+        if connection_factory is None:
+            connection_factory = pika.SelectConnection
+
+        RabbitDriver.connection = connection_factory(
             parameters = parameters, 
             on_open_callback = lambda connection: RabbitDriver.__setup_channels(connection),
             on_close_callback = lambda event: print(f'Connection closed (by {event} event)')
@@ -104,8 +119,23 @@ class RabbitDriver:
 
         # Open new thread on each queue and saving
         for queue_name in RabbitDriver.queues_configurations:
-            RabbitDriver.__setup_queue(queue_name, RabbitDriver.queues_configurations[queue_name], channel)
-        
+            queue_declaration: RabbitQueue = RabbitDriver.queues_configurations[queue_name]
+
+            ''' Queues with an adaptive pool own their channel, since their prefetch is set for the whole channel '''
+            if queue_declaration.is_new_channel or queue_declaration.concurrency is not None:
+                RabbitDriver.connection.channel(on_open_callback = functools.partial(
+                    RabbitDriver.__setup_queue_channel, queue_name, queue_declaration
+                ))
+                continue
+
+            RabbitDriver.__setup_queue(queue_name, queue_declaration, channel)
+            RabbitDriver.active_channels[queue_name] = channel
+
+    @staticmethod
+    def __setup_queue_channel(queue_name: str, queue_declaration: RabbitQueue, channel: Channel) -> None:
+        print('__setup_queue_channel() executing')
+
+        RabbitDriver.__setup_queue(queue_name, queue_declaration, channel)
         RabbitDriver.active_channels[queue_name] = channel
 
     @staticmethod
@@ -116,18 +146,42 @@ class RabbitDriver:
         
         ''' In case the queue_configuration has a callback function, it means the user want to set a consumer '''
         if queue_declaration.callback is not None:            
+            on_message_callback: Callable = lambda *_args: threading.Thread(
+                name=f'rabbitmq_queue_handler:{queue_name}', 
+                target=queue_declaration.callback, args=_args
+            ).start()
+
+            if queue_declaration.concurrency is not None:
+                RabbitDriver.__setup_adaptive_concurrency(queue_declaration.concurrency, queue_declaration.callback, channel)
+                on_message_callback = queue_declaration.concurrency.submit
+
             channel.basic_consume(
                 queue_name,
-                lambda *_args: threading.Thread(
-                    name=f'rabbitmq_queue_handler:{queue_name}', 
-                    target=queue_declaration.callback, args=_args
-                ).start(),
+                on_message_callback,
                 auto_ack = queue_declaration.auto_ack,
                 exclusive = queue_declaration.exclusive,
                 consumer_tag = queue_declaration.consumer_tag,
                 arguments = queue_declaration.arguments
             )
         
+    @staticmethod
+    def __setup_adaptive_concurrency(pool: AdaptiveHandlerPool, callback: Callable, channel: Channel) -> None:
+        print('__setup_adaptive_concurrency() executing')
+
+        '''
+            The queue owns this channel, so a global qos is the prefetch of this consumer alone,
+            and unlike a per consumer qos, it applies immediately to the already started consumer
+        '''
+        channel.basic_qos(prefetch_count=pool.prefetch_count, global_qos=True)
+
+        # The limit changes on the handler threads, while channel methods must run on the ioloop thread
+        pool.start(
+            callback,
+            lambda prefetch_count: RabbitDriver.connection.ioloop.add_callback_threadsafe(
+                lambda: channel.basic_qos(prefetch_count=prefetch_count, global_qos=True)
+            )
+        )
+
     @staticmethod
     def get_channel() -> Channel:
         print('get_channel() executing')
@@ -155,6 +209,10 @@ class RabbitDriver:
     def close_connection() -> None:
         print('close_connection() executing')
 
+        for queue_name in RabbitDriver.queues_configurations:
+            if RabbitDriver.queues_configurations[queue_name].concurrency is not None:
+                RabbitDriver.queues_configurations[queue_name].concurrency.stop()
+
         for queue_name in RabbitDriver.active_channels:
             try:
                 RabbitDriver.active_channels[queue_name].close()
@@ -0,0 +1,269 @@
+import argparse
+import json
+import multiprocessing
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Final
+
+from elasticapm.traces import Transaction
+
+from configs.apm_config import create_transaction
+from configs.s3_config import S3Config, S3Path
+from constants.apm_constants import TransactionTypes
+from constants.load_test_constants import DefaultValues, Handlers
+from load_test.load_metrics import LoadMetrics, LoadReport, current_rss_bytes
+from load_test.load_worker import WorkerOptions, WorkerState, run_worker
+from load_test.rate_profile import RateProfile
+from load_test.synthetic_docx import generate_docx
+
+"""
+    LoadHarness -
+    Drives the worker (`RabbitDriver` + `S3Config` + the extractor) under a synthetic load,
+    against local stand-ins: an in-memory RabbitMQ connection and a moto S3 server (or any S3 uri, e.g. MinIO).
+    The worker and the moto server run in their own processes, so the measured latency, throughput and RSS
+    are of the worker alone.
+
+    Usage (from the `src` directory):
+        python load_harness.py --rate 20 --duration 120
+        python load_harness.py --rate 5 --end-rate 100 --duration 300 --report ramp.json
+"""
+
+class HarnessStartupError(Exception):
+    pass
+
+def parse_args() -> argparse.Namespace:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Load and soak test harness for the worker service')
+    parser.add_argument('--rate', type=float, default=DefaultValues.RATE, help='Publish rate (messages/sec), the ramp start rate')
+    parser.add_argument('--end-rate', type=float, default=None, help='Ramp end rate (messages/sec), constant rate when not set')
+    parser.add_argument('--duration', type=float, default=DefaultValues.DURATION_SECONDS, help='Publishing duration in seconds')
+    parser.add_argument('--drain-timeout', type=float, default=DefaultValues.DRAIN_TIMEOUT_SECONDS, help='Seconds to wait for the worker to ack the rest')
+    parser.add_argument('--sample-interval', type=float, default=DefaultValues.SAMPLE_INTERVAL_SECONDS, help='Seconds between time series samples')
+    parser.add_argument('--documents', type=int, default=DefaultValues.DOCUMENTS, help='Number of distinct synthetic docx files')
+    parser.add_argument('--paragraphs', type=int, default=DefaultValues.PARAGRAPHS, help='Paragraphs in each synthetic docx')
+    parser.add_argument('--words-per-paragraph', type=int, default=DefaultValues.WORDS_PER_PARAGRAPH)
+    parser.add_argument('--s3-uri', default=None, help='S3 uri to use (e.g. local MinIO), a moto server is started when not set')
+    parser.add_argument('--s3-access-key-id', default=DefaultValues.S3_ACCESS_KEY_ID)
+    parser.add_argument('--s3-secret-access-key', default=DefaultValues.S3_SECRET_ACCESS_KEY)
+    parser.add_argument('--moto-port', type=int, default=DefaultValues.MOTO_PORT)
+    parser.add_argument('--bucket', default=DefaultValues.BUCKET_NAME)
+    parser.add_argument(
+        '--handler', choices=[Handlers.EXTRACT, Handlers.SERVICE], default=Handlers.EXTRACT,
+        help='The measured work: the extractor on the docx, or the service queue handler (download only)'
+    )
+    parser.add_argument('--adaptive', action='store_true', help='Run the handlers on an adaptive concurrency pool')
+    parser.add_argument('--report', default=None, help='Path of a json file to write the report (with the time series) into')
+    parser.add_argument('--max-p99-ms', type=float, default=None, help='Exit with failure when the p99 latency is higher')
+    parser.add_argument('--min-throughput', type=float, default=None, help='Exit with failure when the throughput (acks/sec) is lower')
+
+    args: argparse.Namespace = parser.parse_args()
+    if args.rate <= 0 or (args.end_rate is not None and args.end_rate <= 0):
+        parser.error('Rates must be positive')
+
+    return args
+
+def wait_for_port(host: str, port: int, process: subprocess.Popen, timeout: float) -> None:
+    """
+        Waits until the process listens on the port, raising `HarnessStartupError` if it exits or the timeout passes
+    """
+    DEADLINE: Final[float] = time.monotonic() + timeout
+    while time.monotonic() < DEADLINE:
+        if process.poll() is not None:
+            raise HarnessStartupError(f'The process listening on {host}:{port} exited with code {process.returncode}')
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+
+    raise HarnessStartupError(f'Nothing listens on {host}:{port} after {timeout} seconds')
+
+def start_s3(args: argparse.Namespace, transaction: Transaction) -> subprocess.Popen | None:
+    """
+        Initializing `S3Config` against the local S3, starting a moto server process in case no uri was provided
+
+        returns: The moto server process (to stop at the end), or None
+    """
+    moto_server: subprocess.Popen = None
+
+    if args.s3_uri is None:
+        moto_server = subprocess.Popen(
+            [sys.executable, '-m', 'moto.server', '-H', DefaultValues.MOTO_HOST, '-p', str(args.moto_port)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        args.s3_uri = f'http://{DefaultValues.MOTO_HOST}:{args.moto_port}'
+        wait_for_port(DefaultValues.MOTO_HOST, args.moto_port, moto_server, DefaultValues.STARTUP_TIMEOUT_SECONDS)
+
+    S3Config.initialize_s3(
+        transaction=transaction, uri=args.s3_uri,
+        access_key_id=args.s3_access_key_id,
+        secret_access_key=args.s3_secret_access_key
+    )
+    return moto_server
+
+def upload_documents(args: argparse.Namespace) -> list[S3Path]:
+    """
+        Uploads the synthetic docx files the jobs are pointing to
+
+        returns: `list[S3Path]` - the paths of the uploaded files
+    """
+    S3Config.S3.create_bucket(Bucket=args.bucket)
+    paths: list[S3Path] = []
+
+    for index in range(args.documents):
+        path: S3Path = S3Path(args.bucket, f'synthetic/{index}.docx')
+        S3Config.S3.put_object(
+            Bucket=path.bucket, Key=path.key,
+            Body=generate_docx(DefaultValues.STYLES_NAMES, args.paragraphs, args.words_per_paragraph, seed=index)
+        )
+        paths.append(path)
+
+    return paths
+
+def start_worker(
+    args: argparse.Namespace, context: multiprocessing.context.BaseContext,
+    jobs: multiprocessing.Queue, acks: multiprocessing.Queue, state: WorkerState
+) -> multiprocessing.Process:
+    """
+        Starting the worker process, and waiting until it consumes the queue
+    """
+    options: WorkerOptions = WorkerOptions(
+        queue_name=DefaultValues.QUEUE_NAME, s3_uri=args.s3_uri,
+        s3_access_key_id=args.s3_access_key_id, s3_secret_access_key=args.s3_secret_access_key,
+        handler=args.handler, adaptive=args.adaptive
+    )
+    worker: multiprocessing.Process = context.Process(
+        name='load_harness_worker', target=run_worker, args=(options, jobs, acks, state), daemon=True
+    )
+    worker.start()
+
+    DEADLINE: Final[float] = time.monotonic() + DefaultValues.STARTUP_TIMEOUT_SECONDS
+    while not state.ready.value:
+        if not worker.is_alive():
+            raise HarnessStartupError(f'The worker process exited with code {worker.exitcode}')
+        if time.monotonic() > DEADLINE:
+            raise HarnessStartupError(f'The worker was not ready after {DefaultValues.STARTUP_TIMEOUT_SECONDS} seconds')
+        time.sleep(0.01)
+
+    return worker
+
+def collect_acks(acks: multiprocessing.Queue, metrics: LoadMetrics) -> threading.Thread:
+    """
+        Recording the acks the worker reports, until it reports it has stopped
+    """
+    def collect() -> None:
+        while (ack := acks.get()) is not None:
+            metrics.record_ack(*ack)
+
+    collector: threading.Thread = threading.Thread(name='load_harness_acks', target=collect, daemon=True)
+    collector.start()
+    return collector
+
+def publish_load(jobs: multiprocessing.Queue, paths: list[S3Path], profile: RateProfile, metrics: LoadMetrics) -> None:
+    """
+        Publishing jobs by the rate profile, until its duration has passed
+    """
+    START: Final[float] = time.monotonic()
+    next_publish_at: float = START
+    index: int = 0
+
+    while (elapsed := time.monotonic() - START) < profile.duration:
+        jobs.put((json.dumps(paths[index % len(paths)].to_dict()), time.time()))
+        metrics.record_publish()
+        index += 1
+
+        next_publish_at += 1 / profile.rate_at(elapsed)
+        time.sleep(max(0.0, next_publish_at - time.monotonic()))
+
+def wait_for_drain(metrics: LoadMetrics, timeout: float) -> None:
+    DEADLINE: Final[float] = time.monotonic() + timeout
+    while metrics.acked < metrics.published and time.monotonic() < DEADLINE:
+        time.sleep(0.05)
+
+def print_report(report: LoadReport) -> None:
+    print('Load run report:', json.dumps({
+        key: value for key, value in report.to_dict().items() if key != 'samples'
+    }, indent=4))
+
+def check_thresholds(args: argparse.Namespace, report: LoadReport) -> list[str]:
+    """
+        returns: `list[str]` - descriptions of the thresholds the run did not meet
+    """
+    failures: list[str] = []
+    if report.acked < report.published:
+        failures.append(f'{report.published - report.acked} messages were not acked before the drain timeout')
+    if args.max_p99_ms is not None and report.latency_ms.get('p99', 0) > args.max_p99_ms:
+        failures.append(f'p99 latency {report.latency_ms["p99"]:.1f}ms is higher than {args.max_p99_ms}ms')
+    if args.min_throughput is not None and report.throughput < args.min_throughput:
+        failures.append(f'throughput {report.throughput:.2f}/sec is lower than {args.min_throughput}/sec')
+
+    return failures
+
+def run_load(args: argparse.Namespace, metrics: LoadMetrics) -> None:
+    transaction: Transaction = create_transaction('Load harness', TransactionTypes.BACKGROUND_PROCESS)
+    context: multiprocessing.context.BaseContext = multiprocessing.get_context('spawn')
+    jobs: multiprocessing.Queue = context.Queue()
+    acks: multiprocessing.Queue = context.Queue()
+    state: WorkerState = WorkerState(context)
+    moto_server: subprocess.Popen = None
+    worker: multiprocessing.Process = None
+
+    try:
+        moto_server = start_s3(args, transaction)
+        paths: list[S3Path] = upload_documents(args)
+        worker = start_worker(args, context, jobs, acks, state)
+        transaction.end()
+
+        collector: threading.Thread = collect_acks(acks, metrics)
+        metrics.started_at = time.time()
+        stop_sampling: threading.Event = metrics.start_sampling(
+            args.sample_interval,
+            lambda: state.queue_depth.value,
+            lambda: state.unacked.value,
+            lambda: current_rss_bytes(worker.pid),
+            (lambda: state.concurrency_limit.value) if args.adaptive else None
+        )
+
+        profile: RateProfile = RateProfile(args.rate, args.end_rate or args.rate, args.duration)
+        publish_load(jobs, paths, profile, metrics)
+        wait_for_drain(metrics, args.drain_timeout)
+
+        metrics.finished_at = time.time()
+        stop_sampling.set()
+        jobs.put(None)
+        worker.join(DefaultValues.DRAIN_TIMEOUT_SECONDS)
+        collector.join(DefaultValues.DRAIN_TIMEOUT_SECONDS)
+    finally:
+        if worker is not None and worker.is_alive():
+            worker.terminate()
+        if moto_server is not None:
+            moto_server.terminate()
+            moto_server.wait()
+
+def main() -> None:
+    args: argparse.Namespace = parse_args()
+    metrics: LoadMetrics = LoadMetrics()
+
+    try:
+        run_load(args, metrics)
+    except HarnessStartupError as ex:
+        print('Load harness failed to start:', ex)
+        sys.exit(1)
+
+    report: LoadReport = metrics.report()
+    print_report(report)
+
+    if args.report:
+        with open(args.report, 'w') as report_file:
+            json.dump(report.to_dict(), report_file, indent=4)
+
+    failures: list[str] = check_thresholds(args, report)
+    for failure in failures:
+        print('Threshold failed:', failure)
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import itertools
+import queue
+import threading
+from collections import deque
+from typing import Any, Callable
+
+from pika.spec import Basic, BasicProperties
+
+"""
+    InMemoryRabbit -
+    An in-process stand-in for `pika.SelectConnection`, so `RabbitDriver` can be driven without a RabbitMQ server.
+    It implements only the parts of the pika interface the driver uses, with the same threading rules:
+    every channel operation runs on the ioloop thread, other threads hand work over with `add_callback_threadsafe()`.
+"""
+
+class InMemoryIOLoop:
+    def __init__(self) -> None:
+        self._callbacks: queue.Queue = queue.Queue()
+
+    def add_callback_threadsafe(self, callback: Callable[[], None]) -> None:
+        self._callbacks.put(callback)
+
+    def start(self) -> None:
+        while True:
+            callback: Callable[[], None] = self._callbacks.get()
+            if callback is None:
+                break
+            callback()
+
+    def stop(self) -> None:
+        self._callbacks.put(None)
+
+class InMemoryConsumer:
+    def __init__(self, channel: Any, callback: Callable, auto_ack: bool, consumer_tag: str) -> None:
+        self.channel = channel
+        self.callback = callback
+        self.auto_ack = auto_ack
+        self.consumer_tag = consumer_tag
+
+class InMemoryChannel:
+    def __init__(self, connection: Any, channel_number: int) -> None:
+        self.connection = connection
+        self.channel_number = channel_number
+        self.prefetch_count = 0
+        self.is_open = True
+
+    def queue_declare(self, queue: str, callback: Callable = None, **_kwargs) -> None:
+        self.connection._declare_queue(queue)
+        if callback is not None:
+            callback(None)
+
+    def basic_consume(
+        self, queue: str, on_message_callback: Callable,
+        auto_ack: bool = False, exclusive: bool = False,
+        consumer_tag: str = None, arguments: dict[str, Any] = None,
+        callback: Callable = None
+    ) -> str:
+        consumer_tag = consumer_tag or f'ctag{self.channel_number}.{queue}'
+        self.connection._add_consumer(queue, InMemoryConsumer(self, on_message_callback, auto_ack, consumer_tag))
+        if callback is not None:
+            callback(None)
+        return consumer_tag
+
+    def basic_publish(
+        self, exchange: str, routing_key: str, body: bytes | str,
+        properties: BasicProperties = None, mandatory: bool = False
+    ) -> None:
+        self.connection._publish(exchange, routing_key, body, properties or BasicProperties())
+
+    def basic_qos(
+        self, prefetch_size: int = 0, prefetch_count: int = 0,
+        global_qos: bool = False, callback: Callable = None
+    ) -> None:
+        self.prefetch_count = prefetch_count
+        self.connection.ioloop.add_callback_threadsafe(self.connection._dispatch)
+        if callback is not None:
+            callback(None)
+
+    def basic_ack(self, delivery_tag: int = 0, multiple: bool = False) -> None:
+        self.connection._settle(delivery_tag)
+
+    def basic_nack(self, delivery_tag: int = 0, multiple: bool = False, requeue: bool = True) -> None:
+        self.connection._settle(delivery_tag, requeue=requeue)
+
+    def close(self, reply_code: int = 0, reply_text: str = 'Normal shutdown') -> None:
+        self.is_open = False
+
+class InMemoryConnection:
+    def __init__(
+        self, parameters: Any = None,
+        on_open_callback: Callable[[Any], None] = None,
+        on_open_error_callback: Callable = None,
+        on_close_callback: Callable = None,
+        **_kwargs
+    ) -> None:
+        self.parameters = parameters
+        self.ioloop = InMemoryIOLoop()
+        self.is_open = True
+
+        self._lock = threading.Lock()
+        self._channel_numbers = itertools.count(1)
+        self._delivery_tags = itertools.count(1)
+        ''' Format of this dictionary like this: { queue_name: deque[(exchange, body, properties)] } '''
+        self._queues: dict[str, deque] = {}
+        ''' Format of this dictionary like this: { queue_name: InMemoryConsumer } '''
+        self._consumers: dict[str, InMemoryConsumer] = {}
+        ''' Format of this dictionary like this: { delivery_tag: (queue_name, message, channel_number) } '''
+        self._unacked: dict[int, tuple[str, tuple, int]] = {}
+        ''' Format of this dictionary like this: { channel_number: unacked_count } '''
+        self._unacked_per_channel: dict[int, int] = {}
+
+        # Like pika, the "open" callback is called only after the ioloop has started
+        if on_open_callback is not None:
+            self.ioloop.add_callback_threadsafe(lambda: on_open_callback(self))
+
+    def channel(self, channel_number: int = None, on_open_callback: Callable[[Any], None] = None) -> InMemoryChannel:
+        channel: InMemoryChannel = InMemoryChannel(self, channel_number or next(self._channel_numbers))
+        if on_open_callback is not None:
+            self.ioloop.add_callback_threadsafe(lambda: on_open_callback(channel))
+
+        return channel
+
+    def close(self, reply_code: int = 200, reply_text: str = 'Normal shutdown') -> None:
+        self.is_open = False
+        self.ioloop.stop()
+
+    def queue_depth(self) -> int:
+        """
+            returns: `int` - Number of messages waiting in all the queues (not yet delivered)
+        """
+        with self._lock:
+            return sum(len(messages) for messages in self._queues.values())
+
+    def unacked_count(self) -> int:
+        """
+            returns: `int` - Number of messages delivered to consumers and not acked yet
+        """
+        with self._lock:
+            return len(self._unacked)
+
+    def _declare_queue(self, queue_name: str) -> None:
+        with self._lock:
+            self._queues.setdefault(queue_name, deque())
+
+    def _add_consumer(self, queue_name: str, consumer: InMemoryConsumer) -> None:
+        with self._lock:
+            self._queues.setdefault(queue_name, deque())
+            self._consumers[queue_name] = consumer
+        self.ioloop.add_callback_threadsafe(self._dispatch)
+
+    def _publish(self, exchange: str, routing_key: str, body: bytes | str, properties: BasicProperties) -> None:
+        with self._lock:
+            # The default exchange routes by queue name, messages to undeclared queues are dropped
+            if routing_key not in self._queues:
+                return
+            self._queues[routing_key].append((exchange, body, properties))
+        self.ioloop.add_callback_threadsafe(self._dispatch)
+
+    def _settle(self, delivery_tag: int, requeue: bool = False) -> None:
+        with self._lock:
+            queue_name, message, channel_number = self._unacked.pop(delivery_tag, (None, None, None))
+            if queue_name is not None:
+                self._unacked_per_channel[channel_number] -= 1
+                if requeue:
+                    self._queues[queue_name].appendleft(message)
+        self.ioloop.add_callback_threadsafe(self._dispatch)
+
+    def _dispatch(self) -> None:
+        """
+            Delivers the waiting messages to the consumers (must run on the ioloop thread)
+        """
+        for queue_name, consumer in list(self._consumers.items()):
+            while True:
+                with self._lock:
+                    channel_number: int = consumer.channel.channel_number
+                    unacked: int = self._unacked_per_channel.get(channel_number, 0)
+                    prefetch_count: int = consumer.channel.prefetch_count
+                    if not self._queues[queue_name] or (prefetch_count and unacked >= prefetch_count and not consumer.auto_ack):
+                        break
+                    message: tuple = self._queues[queue_name].popleft()
+                    delivery_tag: int = next(self._delivery_tags)
+                    if not consumer.auto_ack:
+                        self._unacked[delivery_tag] = (queue_name, message, channel_number)
+                        self._unacked_per_channel[channel_number] = unacked + 1
+
+                exchange, body, properties = message
+                method: Basic.Deliver = Basic.Deliver(
+                    consumer_tag=consumer.consumer_tag, delivery_tag=delivery_tag,
+                    redelivered=False, exchange=exchange, routing_key=queue_name
+                )
+                consumer.callback(consumer.channel, method, properties, body)
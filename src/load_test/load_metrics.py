@@ -0,0 +1,164 @@
+import os
+import resource
+import threading
+import time
+from dataclasses import dataclass, asdict, field
+from typing import Any, Callable
+
+import numpy as np
+
+from constants.load_test_constants import LATENCY_PERCENTILES
+
+"""
+    LoadMetrics -
+    Collects the measurements of a load run: per message latencies and a time series of samples
+"""
+
+@dataclass
+class LoadSample:
+    """
+        A single point of the load run time series.
+
+        `elapsed: float` - Seconds since the run started
+        `publish_rate: float` - Messages published per second since the previous sample
+        `ack_rate: float` - Messages acked per second since the previous sample (throughput)
+        `queue_depth: int` - Messages waiting in the broker, not delivered yet
+        `unacked: int` - Messages delivered to the worker and not acked yet
+        `ack_lag: int` - Messages published and not acked yet (`queue_depth` + `unacked`)
+        `rss_bytes: int` - Resident memory of the worker process (None when it can not be measured)
+        `concurrency_limit: int` - The adaptive concurrency limit of the handlers (None when not adaptive)
+    """
+    elapsed: float
+    publish_rate: float
+    ack_rate: float
+    queue_depth: int
+    unacked: int
+    ack_lag: int
+    rss_bytes: int | None
+    concurrency_limit: int | None = None
+
+@dataclass
+class LoadReport:
+    published: int
+    acked: int
+    errors: int
+    duration: float
+    throughput: float
+    latency_ms: dict[str, float]
+    queue_wait_ms: dict[str, float]
+    peak_ack_lag: int
+    peak_rss_bytes: int | None
+    samples: list[LoadSample] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+def current_rss_bytes(pid: int = None) -> int | None:
+    """
+        args:
+            - `pid: int` - The process to measure (default: the current process)
+
+        returns: `int` - The current resident memory of the process.
+            Where /proc is not available, the peak one of the current process, or None for other processes
+    """
+    try:
+        with open(f'/proc/{pid or "self"}/statm', 'r') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 if pid is None else None
+
+def _percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+
+    in_ms: np.ndarray = np.asarray(values) * 1000
+    results: dict[str, float] = {
+        f'p{percentile}': float(value)
+        for percentile, value in zip(LATENCY_PERCENTILES, np.percentile(in_ms, LATENCY_PERCENTILES))
+    }
+    results['max'] = float(in_ms.max())
+    return results
+
+class LoadMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.published: int = 0
+        self.acked: int = 0
+        self.errors: int = 0
+        self.latencies: list[float] = []
+        self.queue_waits: list[float] = []
+        self.samples: list[LoadSample] = []
+        self.started_at: float = time.time()
+        self.finished_at: float = None
+
+    def record_publish(self) -> None:
+        with self._lock:
+            self.published += 1
+
+    def record_ack(self, published_at: float, started_at: float, acked_at: float, failed: bool = False) -> None:
+        """
+            Records a settled message.
+
+            args:
+                - `published_at: float` - When the message was published (epoch seconds)
+                - `started_at: float` - When the handler started to process it
+                - `acked_at: float` - When the message was acked
+                - `failed: bool` - The handler raised an exception
+        """
+        with self._lock:
+            self.acked += 1
+            self.errors += int(failed)
+            self.latencies.append(acked_at - published_at)
+            self.queue_waits.append(started_at - published_at)
+
+    def start_sampling(
+        self, interval: float,
+        queue_depth: Callable[[], int], unacked: Callable[[], int],
+        rss_bytes: Callable[[], int | None] = current_rss_bytes,
+        concurrency_limit: Callable[[], int] = None
+    ) -> threading.Event:
+        """
+            Samples the rates, broker state and the worker RSS every `interval` seconds in a background thread
+
+            returns: `threading.Event` - set it to stop the sampling
+        """
+        stop_event: threading.Event = threading.Event()
+
+        def sample_loop() -> None:
+            previous_at, previous_published, previous_acked = time.time(), 0, 0
+            while not stop_event.wait(interval):
+                now: float = time.time()
+                with self._lock:
+                    published, acked = self.published, self.acked
+
+                elapsed_interval: float = now - previous_at
+                self.samples.append(LoadSample(
+                    elapsed=now - self.started_at,
+                    publish_rate=(published - previous_published) / elapsed_interval,
+                    ack_rate=(acked - previous_acked) / elapsed_interval,
+                    queue_depth=queue_depth(),
+                    unacked=unacked(),
+                    ack_lag=published - acked,
+                    rss_bytes=rss_bytes(),
+                    concurrency_limit=concurrency_limit() if concurrency_limit else None
+                ))
+                previous_at, previous_published, previous_acked = now, published, acked
+
+        threading.Thread(name='load_metrics_sampler', target=sample_loop, daemon=True).start()
+        return stop_event
+
+    def report(self) -> LoadReport:
+        with self._lock:
+            duration: float = (self.finished_at or time.time()) - self.started_at
+            return LoadReport(
+                published=self.published,
+                acked=self.acked,
+                errors=self.errors,
+                duration=duration,
+                throughput=self.acked / duration if duration else 0.0,
+                latency_ms=_percentiles(self.latencies),
+                queue_wait_ms=_percentiles(self.queue_waits),
+                peak_ack_lag=max((sample.ack_lag for sample in self.samples), default=0),
+                peak_rss_bytes=max((sample.rss_bytes for sample in self.samples if sample.rss_bytes is not None), default=None),
+                samples=list(self.samples)
+            )
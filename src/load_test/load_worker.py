@@ -0,0 +1,177 @@
+import functools
+import json
+import multiprocessing
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Final
+
+from pika.channel import Channel
+from pika.credentials import PlainCredentials
+from pika.spec import Basic, BasicProperties
+from elasticapm.traces import Transaction
+
+from configs.apm_config import create_transaction
+from configs.s3_config import S3Config, S3Path
+from constants.apm_constants import TransactionTypes
+from constants.load_test_constants import DefaultValues, Handlers, Headers
+from drivers.adaptive_concurrency import AdaptiveHandlerPool
+from drivers.rabbit_driver import RabbitDriver, RabbitQueue
+from handlers.rabbit_handlers import receive_docx_handler
+from load_test.in_memory_rabbit import InMemoryConnection
+from utils.text_extractor import extract_strings_by_style
+
+"""
+    LoadWorker -
+    The worker side of the load harness, running in its own process (so its RSS, latency and throughput
+    are not mixed with the publisher, the sampler or the S3 stand-in).
+    It runs `RabbitDriver` on an in-memory connection, publishes the jobs it receives from the harness into it,
+    and reports back every ack and its broker state.
+"""
+
+@dataclass
+class WorkerOptions:
+    queue_name: str
+    s3_uri: str
+    s3_access_key_id: str
+    s3_secret_access_key: str
+    handler: str = Handlers.EXTRACT
+    adaptive: bool = False
+
+class WorkerState:
+    '''
+        Values shared between the harness and the worker process
+    '''
+    def __init__(self, context: multiprocessing.context.BaseContext) -> None:
+        self.ready = context.Value('b', False)
+        self.queue_depth = context.Value('i', 0)
+        self.unacked = context.Value('i', 0)
+        self.concurrency_limit = context.Value('i', 0)
+
+def _download_docx(body: Any) -> bytes:
+    s3_path: S3Path = S3Path.from_dict(json.loads(body))
+    return S3Config.S3.get_object(Bucket=s3_path.bucket, Key=s3_path.key)['Body'].read()
+
+def extract_docx_handler(
+    channel: Channel, method: Basic.Deliver,
+    properties: BasicProperties, body: Any
+) -> None:
+    """
+        Runs the extractor on the job's docx, downloaded from S3 into a temporary file
+    """
+    with tempfile.NamedTemporaryFile(suffix='.docx') as docx_file:
+        docx_file.write(_download_docx(body))
+        docx_file.flush()
+        extract_strings_by_style(docx_file.name, DefaultValues.STYLES_NAMES)
+
+def service_docx_handler(
+    channel: Channel, method: Basic.Deliver,
+    properties: BasicProperties, body: Any
+) -> None:
+    """
+        Downloads the job's docx from S3, then runs the service's queue handler
+    """
+    _download_docx(body)
+    receive_docx_handler(channel, method, properties, body)
+
+''' Format of this dictionary like this: { handler_name: queue_handler } '''
+HANDLERS: Final[dict[str, Callable[[Channel, Basic.Deliver, BasicProperties, Any], None]]] = {
+    Handlers.EXTRACT: extract_docx_handler,
+    Handlers.SERVICE: service_docx_handler
+}
+
+def instrument_handler(
+    handler: Callable[[Channel, Basic.Deliver, BasicProperties, Any], None],
+    acks: multiprocessing.Queue
+) -> Callable[[Channel, Basic.Deliver, BasicProperties, Any], None]:
+    """
+        Wraps the queue handler with the ack and reporting the ack to the harness
+    """
+    @functools.wraps(handler)
+    def instrumented_handler(
+        channel: Channel, method: Basic.Deliver,
+        properties: BasicProperties, body: Any
+    ) -> None:
+        started_at: float = time.time()
+        failed: bool = False
+
+        try:
+            handler(channel, method, properties, body)
+        except Exception as ex:
+            print('Load harness handler failed:', ex)
+            failed = True
+
+        def ack() -> None:
+            channel.basic_ack(method.delivery_tag)
+            acks.put((properties.headers[Headers.PUBLISHED_AT], started_at, time.time(), failed))
+
+        # Channels are not thread safe, the ack must run on the connection's ioloop thread
+        RabbitDriver.connection.ioloop.add_callback_threadsafe(ack)
+
+    return instrumented_handler
+
+def _report_state(state: WorkerState, concurrency: AdaptiveHandlerPool | None) -> None:
+    connection: InMemoryConnection = RabbitDriver.connection
+    while True:
+        state.queue_depth.value = connection.queue_depth()
+        state.unacked.value = connection.unacked_count()
+        if concurrency is not None:
+            state.concurrency_limit.value = concurrency.concurrency_limit.limit
+        time.sleep(DefaultValues.STATE_INTERVAL_SECONDS)
+
+def run_worker(
+    options: WorkerOptions, jobs: multiprocessing.Queue,
+    acks: multiprocessing.Queue, state: WorkerState
+) -> None:
+    """
+        The worker process entry point.
+        Jobs are `(body, published_at)` tuples, `None` stops the worker.
+        Acks are `(published_at, started_at, acked_at, failed)` tuples, followed by `None` when the worker stops.
+    """
+    transaction: Transaction = create_transaction('Load harness worker', TransactionTypes.BACKGROUND_PROCESS)
+    S3Config.initialize_s3(
+        transaction=transaction, uri=options.s3_uri,
+        access_key_id=options.s3_access_key_id,
+        secret_access_key=options.s3_secret_access_key
+    )
+
+    concurrency: AdaptiveHandlerPool = AdaptiveHandlerPool(options.queue_name) if options.adaptive else None
+    RabbitDriver.initialize_rabbitmq(
+        transaction=transaction,
+        host='in-memory', port=0,
+        credentials=PlainCredentials('guest', 'guest'),
+        connection_factory=InMemoryConnection,
+        queues_configurations={
+            options.queue_name: RabbitQueue(callback=instrument_handler(HANDLERS[options.handler], acks), concurrency=concurrency)
+        }
+    )
+    transaction.end()
+
+    listener: threading.Thread = threading.Thread(name='load_worker_listener', target=RabbitDriver.listen, daemon=True)
+    listener.start()
+
+    DEADLINE: Final[float] = time.monotonic() + DefaultValues.STARTUP_TIMEOUT_SECONDS
+    # Jobs published before the queue is declared would be dropped, so ready means the queue is consumed
+    while RabbitDriver.default_channel is None or options.queue_name not in RabbitDriver.active_channels:
+        if not listener.is_alive() or time.monotonic() > DEADLINE:
+            print('Load worker failed to open the channels')
+            sys.exit(1)
+        time.sleep(0.01)
+
+    threading.Thread(name='load_worker_state', target=_report_state, args=(state, concurrency), daemon=True).start()
+    state.ready.value = True
+
+    channel: Channel = RabbitDriver.get_channel()
+    while (job := jobs.get()) is not None:
+        body, published_at = job
+        RabbitDriver.connection.ioloop.add_callback_threadsafe(functools.partial(
+            channel.basic_publish, exchange='', routing_key=options.queue_name, body=body,
+            properties=BasicProperties(headers={Headers.PUBLISHED_AT: published_at})
+        ))
+
+    # Closing after the acks already scheduled on the ioloop
+    RabbitDriver.connection.ioloop.add_callback_threadsafe(RabbitDriver.close_connection)
+    listener.join()
+    acks.put(None)
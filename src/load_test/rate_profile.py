@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+
+@dataclass
+class RateProfile:
+    """
+        Publish rate over time, linear ramp from `start_rate` to `end_rate` (constant when they are equal)
+    """
+    start_rate: float
+    end_rate: float
+    duration: float
+
+    def rate_at(self, elapsed: float) -> float:
+        progress: float = min(elapsed / self.duration, 1.0) if self.duration else 1.0
+        return self.start_rate + (self.end_rate - self.start_rate) * progress
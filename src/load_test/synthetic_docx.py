@@ -0,0 +1,78 @@
+import random
+from io import BytesIO
+from typing import Final
+from zipfile import ZipFile, ZIP_DEFLATED
+
+"""
+    SyntheticDocx -
+    Generates minimal DOCX files whose styles and runs match the queries of `extract_strings_by_style()`
+"""
+
+W_NAMESPACE: Final[str] = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+CONTENT_TYPES_XML: Final[str] = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+WORDS: Final[list[str]] = [
+    'lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit',
+    'sed', 'do', 'eiusmod', 'tempor', 'incididunt', 'ut', 'labore', 'magna'
+]
+
+def style_id(style_name: str) -> str:
+    """
+        Generates the character style id of a style name (e.g. 'heading 1' -> 'Heading1Char')
+    """
+    return ''.join(word.capitalize() for word in style_name.split()) + 'Char'
+
+def _styles_xml(styles_names: list[str]) -> str:
+    styles: str = ''.join(
+        f'<w:style w:type="paragraph" w:styleId="{style_id(name)[:-len("Char")]}">'
+        f'<w:name w:val="{name}"/><w:link w:val="{style_id(name)}"/></w:style>'
+        for name in styles_names
+    )
+    return f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:styles xmlns:w="{W_NAMESPACE}">{styles}</w:styles>'
+
+def _document_xml(styles_names: list[str], paragraphs: int, words_per_paragraph: int, rand: random.Random) -> str:
+    body: list[str] = []
+    for _ in range(paragraphs):
+        text: str = ' '.join(rand.choices(WORDS, k=words_per_paragraph))
+        # Unstyled runs are part of the mix, like in real documents
+        name: str | None = rand.choice(styles_names + [None])
+        run_properties: str = f'<w:rPr><w:rStyle w:val="{style_id(name)}"/></w:rPr>' if name else ''
+        body.append(f'<w:p><w:r>{run_properties}<w:t xml:space="preserve">{text}</w:t></w:r></w:p>')
+
+    return (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{W_NAMESPACE}"><w:body>{"".join(body)}</w:body></w:document>'
+    )
+
+def generate_docx(
+    styles_names: list[str], paragraphs: int,
+    words_per_paragraph: int, seed: int = None
+) -> bytes:
+    """
+        Generates a DOCX file content.
+
+        args:
+            - `styles_names: list[str]` - Names of the styles the runs are styled with
+            - `paragraphs: int` - Number of paragraphs (one run each) in the document
+            - `words_per_paragraph: int` - Number of words in each run
+            - `seed: int` - Seed of the random words generation (same seed -> same document)
+
+        returns: `bytes` - the content of the DOCX (zip) file
+    """
+    rand: random.Random = random.Random(seed)
+    content: BytesIO = BytesIO()
+
+    with ZipFile(content, 'w', ZIP_DEFLATED) as ARCHIVE:
+        ARCHIVE.writestr('[Content_Types].xml', CONTENT_TYPES_XML)
+        ARCHIVE.writestr('word/styles.xml', _styles_xml(styles_names))
+        ARCHIVE.writestr('word/document.xml', _document_xml(styles_names, paragraphs, words_per_paragraph, rand))
+
+    return content.getvalue()
@@ -0,0 +1,284 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Final
+
+import lxml.etree as etree
+
+from constants.styles_cache_constants import DefaultValues, EnvKeys, WORD_NAMESPACES
+
+"""
+    StylesCache -
+    Most documents are created from a small set of templates, so their `word/styles.xml` parts are identical.
+    This module compiles a styles.xml into a { style_name: [style_ids] } map (with `w:basedOn` inheritance resolved)
+    and caches it by the hash of the styles.xml content, in two levels:
+        1. In the process memory (LRU)
+        2. In a directory shared by all the worker processes (tmpfs by default), one file per styles.xml hash.
+           Files are written atomically and evicted by LRU: their mtime is touched on every shared hit,
+           and at most every `SHARED_TOUCH_INTERVAL_SECONDS` while the entry is served from the process memory.
+           In case the directory can not be used, the cache falls back to the process memory only
+"""
+
+@dataclass
+class StylesCacheStats:
+    """
+        `hits: int` - Lookups served from the process memory
+        `shared_hits: int` - Lookups served from the shared directory (compiled by another process, or evicted locally)
+        `misses: int` - Lookups that compiled the styles.xml
+    """
+    hits: int = 0
+    shared_hits: int = 0
+    misses: int = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.shared_hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return (self.hits + self.shared_hits) / self.lookups if self.lookups else 0.0
+
+def compile_styles(styles_content: bytes) -> dict[str, list[str]]:
+    """
+        Compiles styles.xml content into a map of style names to the (linked) style ids used in the document.
+        A style based on another style (`w:basedOn`, recursively) is listed under the names of its ancestors as well.
+
+        args:
+            - `styles_content: bytes` - the styles.xml content
+
+        returns: dictionary - { 'style name': ['style_id', ...] }
+    """
+    tree: etree._Element = etree.fromstring(styles_content)
+    ''' Format of this dictionary like this: { style_id: (name, link, based_on) } '''
+    styles: dict[str, tuple[str, str, str]] = {}
+
+    for style in tree.xpath('.//w:style', namespaces=WORD_NAMESPACES):
+        name: list[str] = style.xpath('./w:name/@w:val', namespaces=WORD_NAMESPACES)
+        link: list[str] = style.xpath('./w:link/@w:val', namespaces=WORD_NAMESPACES)
+        based_on: list[str] = style.xpath('./w:basedOn/@w:val', namespaces=WORD_NAMESPACES)
+        styles[style.get(f'{{{WORD_NAMESPACES["w"]}}}styleId')] = (
+            name[0] if name else None, link[0] if link else None, based_on[0] if based_on else None
+        )
+
+    compiled: dict[str, list[str]] = {}
+    for style_id, (_, link, _) in styles.items():
+        if link is None:
+            continue
+
+        # Walking up the inheritance chain (guarding against broken, cyclic, chains)
+        visited: set[str] = set()
+        ancestor_id: str = style_id
+        while ancestor_id in styles and ancestor_id not in visited:
+            visited.add(ancestor_id)
+            ancestor_name, _, parent_id = styles[ancestor_id]
+            if ancestor_name is not None and link not in compiled.setdefault(ancestor_name, []):
+                compiled[ancestor_name].append(link)
+            ancestor_id = parent_id
+
+    return compiled
+
+def resolve_style_ids(compiled_styles: dict[str, list[str]], style_name: str) -> list[str]:
+    """
+        Returns the style ids of all the styles whose name contains `style_name` (like the `contains()` xpath query)
+    """
+    style_ids: list[str] = []
+    for name, ids in compiled_styles.items():
+        if style_name in name:
+            style_ids.extend(style_id for style_id in ids if style_id not in style_ids)
+
+    return style_ids
+
+class StylesCache:
+    def __init__(
+        self, cache_dir: str = None, max_entries: int = None,
+        touch_interval: float = DefaultValues.SHARED_TOUCH_INTERVAL_SECONDS
+    ) -> None:
+        if cache_dir is None:
+            cache_dir = os.getenv(EnvKeys.STYLES_CACHE_DIR, DefaultValues.STYLES_CACHE_DIR)
+
+        if max_entries is None:
+            max_entries = int(os.getenv(EnvKeys.STYLES_CACHE_MAX_ENTRIES, DefaultValues.STYLES_CACHE_MAX_ENTRIES))
+
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.stats = StylesCacheStats()
+
+        self._lock = threading.Lock()
+        ''' Format of this dictionary like this: { styles_hash: compiled_styles }, ordered from least recently used '''
+        self._entries: OrderedDict[str, dict[str, list[str]]] = OrderedDict()
+        ''' Format of this dictionary like this: { styles_hash: last time the shared entry was touched (monotonic) } '''
+        self._touched_at: dict[str, float] = {}
+        # The shared directory is created on the first lookup (None - not checked yet)
+        self._shared_enabled: bool | None = None
+
+    def get(self, styles_content: bytes) -> dict[str, list[str]]:
+        """
+            Returns the compiled styles of the styles.xml content, compiling it only if no process has done it before.
+
+            args:
+                - `styles_content: bytes` - the styles.xml content
+
+            returns: dictionary - { 'style name': ['style_id', ...] } (must not be modified, it is shared)
+        """
+        STYLES_HASH: Final[str] = hashlib.sha256(styles_content).hexdigest()
+
+        with self._lock:
+            compiled: dict[str, list[str]] = self._entries.get(STYLES_HASH)
+            if compiled is not None:
+                self._entries.move_to_end(STYLES_HASH)
+                self.stats.hits += 1
+
+        if compiled is not None:
+            self._touch_shared(STYLES_HASH, compiled)
+            return compiled
+
+        compiled = self._read_shared(STYLES_HASH)
+        if compiled is not None:
+            with self._lock:
+                self.stats.shared_hits += 1
+        else:
+            compiled = compile_styles(styles_content)
+            self._write_shared(STYLES_HASH, compiled)
+            with self._lock:
+                self.stats.misses += 1
+
+        with self._lock:
+            self._entries[STYLES_HASH] = compiled
+            self._entries.move_to_end(STYLES_HASH)
+            while len(self._entries) > self.max_entries:
+                evicted_hash, _ = self._entries.popitem(last=False)
+                self._touched_at.pop(evicted_hash, None)
+
+        return compiled
+
+    def clear(self) -> None:
+        """
+            Clears both the process memory and the shared directory entries
+            (only the cache's own files, the directory may be shared with other files)
+        """
+        with self._lock:
+            self._entries.clear()
+            self._touched_at.clear()
+
+        if not self._ensure_shared_dir():
+            return
+
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(('.json', '.tmp')):
+                continue
+
+            try:
+                os.remove(os.path.join(self.cache_dir, file_name))
+            except FileNotFoundError:
+                pass
+
+    def _ensure_shared_dir(self) -> bool:
+        """
+            Creates the shared directory on the first call
+
+            returns: `bool` - whether the shared directory can be used
+        """
+        if self._shared_enabled is None:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self._shared_enabled = True
+            except OSError as ex:
+                print('Can not create the shared styles cache directory, caching in the process memory only', ex)
+                self._shared_enabled = False
+
+        return self._shared_enabled
+
+    def _entry_path(self, styles_hash: str) -> str:
+        return os.path.join(self.cache_dir, f'{styles_hash}.json')
+
+    def _touch_shared(self, styles_hash: str, compiled: dict[str, list[str]]) -> None:
+        """
+            Marks a shared entry served from the process memory as recently used (rate limited),
+            re-writing it in case another process has evicted it
+        """
+        now: float = time.monotonic()
+        with self._lock:
+            if now - self._touched_at.get(styles_hash, float('-inf')) < self.touch_interval:
+                return
+            self._touched_at[styles_hash] = now
+
+        if not self._ensure_shared_dir():
+            return
+
+        try:
+            os.utime(self._entry_path(styles_hash))
+        except FileNotFoundError:
+            self._write_shared(styles_hash, compiled)
+        except OSError:
+            pass
+
+    def _read_shared(self, styles_hash: str) -> dict[str, list[str]] | None:
+        if not self._ensure_shared_dir():
+            return None
+
+        path: str = self._entry_path(styles_hash)
+        try:
+            with open(path, 'r') as entry_file:
+                compiled: dict[str, list[str]] = json.load(entry_file)
+            os.utime(path)
+            with self._lock:
+                self._touched_at[styles_hash] = time.monotonic()
+            return compiled
+        except (OSError, ValueError):
+            # Missing, or evicted meanwhile by another process
+            return None
+
+    def _write_shared(self, styles_hash: str, compiled: dict[str, list[str]]) -> None:
+        if not self._ensure_shared_dir():
+            return
+
+        temp_path: str = None
+        try:
+            # Writing to a temporary file and renaming it, so other processes never read a partial entry
+            file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            # mkstemp creates the file as 0600, which workers of other users could not read
+            os.fchmod(file_descriptor, DefaultValues.SHARED_ENTRY_MODE)
+            with os.fdopen(file_descriptor, 'w') as entry_file:
+                json.dump(compiled, entry_file)
+            os.replace(temp_path, self._entry_path(styles_hash))
+            temp_path = None
+
+            with self._lock:
+                self._touched_at[styles_hash] = time.monotonic()
+            self._evict_shared()
+        except (OSError, TypeError, ValueError) as ex:
+            print('Can not write to the shared styles cache', ex)
+        finally:
+            if temp_path is not None:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    def _evict_shared(self) -> None:
+        """
+            Removes the least recently used entries of the shared directory, beyond `max_entries`
+        """
+        entries: list[tuple[float, str]] = []
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith('.json'):
+                continue
+            try:
+                path: str = os.path.join(self.cache_dir, file_name)
+                entries.append((os.stat(path).st_mtime, path))
+            except FileNotFoundError:
+                pass
+
+        for _, path in sorted(entries)[:max(0, len(entries) - self.max_entries)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+styles_cache: StylesCache = StylesCache()
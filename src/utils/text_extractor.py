@@ -1,5 +1,3 @@
-import os
-
 from dataclasses import dataclass
 from typing import Any, Final, List
 from zipfile import ZipFile
@@ -9,6 +7,8 @@ from io import StringIO
 
 from dacite import from_dict
 
+from utils.styles_cache import styles_cache, resolve_style_ids
+
 @dataclass
 class ValuesXPathResponse:
     hits: list[Any]
@@ -34,16 +34,19 @@ def get_values_by_xpath(root: bytes | etree._Element, xpath_query: str) -> Value
         This function extracts values from the XML by xpath query.
 
         args:
-            - `xml_content: bytes | etree._Element` - the xml content (in bytes) or generated _Element
+            - `root: bytes | etree._Element` - the xml content (in bytes) or an already parsed _Element
             - `xpath_query: str` - string of the xpath query
 
         returns: List of all values matching the query
     """
-    tree: etree._Element = None
+    tree: etree._Element = root
     if type(root) == bytes:
         # In case its file content
         namespaces: dict[str, str] = xml_extract_namespaces(root)
         tree = etree.fromstring(root)
+    else:
+        # The default namespace (None prefix) can not be used in xpath queries
+        namespaces: dict[str, str] = { prefix: uri for prefix, uri in root.nsmap.items() if prefix }
 
     return from_dict(data_class=ValuesXPathResponse, data={
         'hits': tree.xpath(xpath_query, namespaces=namespaces), 
@@ -70,24 +73,24 @@ def extract_strings_by_style(docx_path: str, styles_names: list[str]) -> dict[st
         # { [type_name: string]: [words] }
         results: dict[str, list[str]] = {}
         DOC_XML_ROOT: Final[etree._Element] = etree.fromstring(DOCUMENT_CONTENT)
+        # Documents of the same template share the styles.xml, so it is compiled once for all of them
+        COMPILED_STYLES: Final[dict[str, list[str]]] = styles_cache.get(STYLES_CONTENT)
 
         for style_name in styles_names:
-            STYLE_XPATH_QUERY: str = f".//*[contains(@w:val,'{style_name}')]/../w:link/@w:val"
-            response: ValuesXPathResponse = get_values_by_xpath(STYLES_CONTENT, STYLE_XPATH_QUERY)
-            style_ids: list[str] = response.hits
+            style_ids: list[str] = resolve_style_ids(COMPILED_STYLES, style_name)
 
             for style_id in style_ids:
                 IN_DOCUMENT_XPATH_QUERY: str = f".//*[@w:val='{style_id}']/../../w:t"
-                value: ValuesXPathResponse = get_values_by_xpath(DOCUMENT_CONTENT, IN_DOCUMENT_XPATH_QUERY, DOC_XML_ROOT)
+                value: ValuesXPathResponse = get_values_by_xpath(DOC_XML_ROOT, IN_DOCUMENT_XPATH_QUERY)
                 
                 elements: list[etree._Element] = value.hits
                 if elements:
-                    results[style_name] = elements
+                    # A style name can match a few style ids (e.g. 'heading' -> 'Heading1Char', 'Heading2Char')
+                    results.setdefault(style_name, []).extend(elements)
                     for element in elements:
                         print(f'found values: {element} of type style {style_id}')
                         element.text = f'[{element.text}:{style_id}]'
 
-        etree.ElementTree(DOC_XML_ROOT).write(os.path.join(os.path.dirname(), 'document.xml'))
         return results
 
 if __name__ == '__main__':
@@ -0,0 +1,189 @@
+import os
+
+from dataclasses import dataclass
+from typing import Any, Final
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import lxml.etree as etree
+
+from constants.text_postprocessor_constants import (
+    Columns, ParquetFiles, WHITESPACE_PATTERN, DECORATED_TEXT_PATTERN
+)
+
+"""
+    TextPostProcessor -
+    This module post-processes batches of `extract_strings_by_style` results column-wise.
+    The texts are held as an Arrow string column, while the style names and document ids are
+    held as dictionary (categorical) columns, so normalization, dedup and counting run on whole columns at once.
+"""
+
+@dataclass
+class TextBatchResult:
+    runs: pa.Table
+    frequencies: pa.Table
+
+def _hit_text(hit: str | etree._Element) -> str:
+    """
+        Returns the raw text of a single extraction hit (`extract_strings_by_style` returns `w:t` elements)
+    """
+    return (hit.text or '') if isinstance(hit, etree._Element) else str(hit)
+
+def build_text_batch(extractions: dict[str, dict[str, list[Any]]]) -> pa.Table:
+    """
+        Flattens the extraction results of many documents into a single columnar table.
+
+        args:
+            - `extractions: dict[str, dict[str, list[Any]]]` - { document_id: { style_name: [hits] } }
+
+        returns: `pa.Table` - with `document_id` and `style_name` as dictionary columns and `text` as string column.
+            The '[text:style_id]' decoration `extract_strings_by_style` adds to the hits is removed (on the whole column),
+            so the same text is deduplicated and counted across styles
+    """
+    texts: list[str] = []
+    chunk_lengths: list[int] = []
+    chunk_style_codes: list[int] = []
+    chunk_document_codes: list[int] = []
+    styles_index: dict[str, int] = {}
+    DOCUMENT_IDS: Final[list[str]] = [str(document_id) for document_id in extractions]
+
+    for document_code, document_id in enumerate(extractions):
+        for style_name, hits in extractions[document_id].items():
+            texts.extend(_hit_text(hit) for hit in hits)
+            chunk_lengths.append(len(hits))
+            chunk_style_codes.append(styles_index.setdefault(style_name, len(styles_index)))
+            chunk_document_codes.append(document_code)
+
+    # Each (document, style) chunk shares a single code, so the codes columns are built by repetition
+    style_codes: np.ndarray = np.repeat(np.asarray(chunk_style_codes, dtype=np.int32), chunk_lengths)
+    document_codes: np.ndarray = np.repeat(np.asarray(chunk_document_codes, dtype=np.int32), chunk_lengths)
+
+    return pa.table({
+        Columns.DOCUMENT: pa.DictionaryArray.from_arrays(
+            pa.array(document_codes, type=pa.int32()), pa.array(DOCUMENT_IDS, type=pa.string())
+        ),
+        Columns.STYLE: pa.DictionaryArray.from_arrays(
+            pa.array(style_codes, type=pa.int32()), pa.array(list(styles_index), type=pa.string())
+        ),
+        Columns.TEXT: pc.replace_substring_regex(
+            pa.array(texts, type=pa.string()), pattern=DECORATED_TEXT_PATTERN, replacement=r'\1'
+        )
+    })
+
+def _column_codes(table: pa.Table, column_name: str) -> np.ndarray:
+    """
+        Returns the categorical codes of a column as a NumPy array (string columns are dictionary-encoded first)
+    """
+    column: pa.Array = table.column(column_name).combine_chunks()
+    if not pa.types.is_dictionary(column.type):
+        column = column.dictionary_encode()
+
+    return column.indices.to_numpy(zero_copy_only=False)
+
+def normalize_whitespace(table: pa.Table) -> pa.Table:
+    """
+        Collapses every whitespace run (including the unicode separators) of the `text` column into a single space and trims both ends.
+
+        args:
+            - `table: pa.Table` - table created by `build_text_batch()`
+
+        returns: `pa.Table` - the same table with the normalized `text` column
+    """
+    TEXT_INDEX: Final[int] = table.schema.get_field_index(Columns.TEXT)
+    collapsed: pa.ChunkedArray = pc.replace_substring_regex(
+        table.column(TEXT_INDEX), pattern=WHITESPACE_PATTERN, replacement=' '
+    )
+
+    return table.set_column(TEXT_INDEX, Columns.TEXT, pc.utf8_trim_whitespace(collapsed))
+
+def drop_empty_texts(table: pa.Table) -> pa.Table:
+    """
+        Drops the rows with an empty `text` (e.g. whitespace only runs, after `normalize_whitespace()`).
+
+        args:
+            - `table: pa.Table` - table created by `build_text_batch()`
+
+        returns: `pa.Table` - the table without the empty texts rows
+    """
+    return table.filter(pc.not_equal(table.column(Columns.TEXT), ''))
+
+def deduplicate(table: pa.Table) -> pa.Table:
+    """
+        Drops repeated (document, style, text) rows, keeping the first occurrence of each.
+
+        args:
+            - `table: pa.Table` - table created by `build_text_batch()`
+
+        returns: `pa.Table` - the table without the duplicated rows (original order is kept)
+    """
+    if table.num_rows == 0:
+        return table
+
+    table = table.unify_dictionaries()
+    keys: np.ndarray = np.stack([
+        _column_codes(table, Columns.DOCUMENT),
+        _column_codes(table, Columns.STYLE),
+        _column_codes(table, Columns.TEXT)
+    ], axis=1)
+
+    _, first_indices = np.unique(keys, axis=0, return_index=True)
+    return table.take(pa.array(np.sort(first_indices)))
+
+def count_frequencies(table: pa.Table) -> pa.Table:
+    """
+        Counts how many times each text appears under each style (on deduplicated runs this is the number of documents).
+
+        args:
+            - `table: pa.Table` - table created by `build_text_batch()`
+
+        returns: `pa.Table` - with `style_name`, `text` and `count` columns, sorted by descending count
+    """
+    if table.num_rows == 0:
+        return table.select([Columns.STYLE, Columns.TEXT]).append_column(Columns.COUNT, pa.array([], type=pa.int64()))
+
+    table = table.unify_dictionaries()
+    keys: np.ndarray = np.stack([
+        _column_codes(table, Columns.STYLE),
+        _column_codes(table, Columns.TEXT)
+    ], axis=1)
+
+    _, first_indices, counts = np.unique(keys, axis=0, return_index=True, return_counts=True)
+    order: np.ndarray = np.argsort(-counts, kind='stable')
+
+    frequencies: pa.Table = table.select([Columns.STYLE, Columns.TEXT]).take(pa.array(first_indices[order]))
+    return frequencies.append_column(Columns.COUNT, pa.array(counts[order], type=pa.int64()))
+
+def write_parquet(table: pa.Table, path: str) -> None:
+    """
+        Writes the table into a parquet file (the dictionary columns are kept as categorical).
+
+        args:
+            - `table: pa.Table` - the table to write
+            - `path: str` - the path of the parquet file
+    """
+    pq.write_table(table, path)
+
+def postprocess_extractions(
+    extractions: dict[str, dict[str, list[Any]]],
+    output_dir: str = None
+) -> TextBatchResult:
+    """
+        Runs the whole post-processing stage on a batch: normalize, drop empty texts, deduplicate and count.
+
+        args:
+            - `extractions: dict[str, dict[str, list[Any]]]` - { document_id: { style_name: [hits] } }
+            - `output_dir: str` - In case it is set, the runs and frequencies tables are written into it as parquet files
+
+        returns: `TextBatchResult` - the deduplicated runs and the frequencies tables
+    """
+    runs: pa.Table = deduplicate(drop_empty_texts(normalize_whitespace(build_text_batch(extractions))))
+    frequencies: pa.Table = count_frequencies(runs)
+
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        write_parquet(runs, os.path.join(output_dir, ParquetFiles.RUNS))
+        write_parquet(frequencies, os.path.join(output_dir, ParquetFiles.FREQUENCIES))
+
+    return TextBatchResult(runs=runs, frequencies=frequencies)
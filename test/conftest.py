@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The service modules are imported relative to `src` (like `python src/main.py` does)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
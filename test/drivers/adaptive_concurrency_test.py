@@ -0,0 +1,135 @@
+import threading
+import time
+
+from drivers.adaptive_concurrency import AdaptiveConcurrencyLimit, AdaptiveHandlerPool
+
+WINDOW: int = 10
+
+def create_limit(**kwargs) -> AdaptiveConcurrencyLimit:
+    # A high CPU target, so only the latency drives the tests' limits
+    options: dict = dict(samples_window=WINDOW, cpu_utilization_target=float('inf'))
+    options.update(kwargs)
+    return AdaptiveConcurrencyLimit(**options)
+
+def run_windows(limit: AdaptiveConcurrencyLimit, windows: int, latency_of) -> list[int]:
+    """
+        Feeds full windows of samples at the current limit, `latency_of(limit)` is the latency of each sample
+
+        returns: `list[int]` - the limit after each window
+    """
+    limits: list[int] = []
+    for _ in range(windows):
+        current_limit: int = limit.limit
+        for _ in range(WINDOW):
+            limit.on_sample(latency_of(current_limit), current_limit)
+        limits.append(limit.limit)
+
+    return limits
+
+def test_limit_changes_once_a_window():
+    limit: AdaptiveConcurrencyLimit = create_limit(initial_limit=4)
+    assert all(limit.on_sample(0.1, 4) is None for _ in range(WINDOW - 1))
+    assert limit.limit == 4
+
+    limit.on_sample(0.1, 4)
+    assert limit.short_latency == 0.1
+    assert limit.no_load_latency == 0.1
+
+def test_grows_to_max_under_flat_latency():
+    limit: AdaptiveConcurrencyLimit = create_limit(initial_limit=4, max_limit=64)
+    limits: list[int] = run_windows(limit, 300, lambda _: 0.1)
+
+    assert limits[10] > 4
+    assert max(limits) == 64
+    assert sum(limits[-100:]) / 100 > 40
+
+def test_does_not_grow_when_limit_is_not_used():
+    limit: AdaptiveConcurrencyLimit = create_limit(initial_limit=8)
+    for _ in range(WINDOW * 20):
+        limit.on_sample(0.1, 1)
+
+    assert limit.limit == 8
+
+def test_stays_low_when_latency_grows_with_concurrency():
+    limit: AdaptiveConcurrencyLimit = create_limit(initial_limit=4)
+    limits: list[int] = run_windows(limit, 300, lambda current_limit: 0.01 * current_limit)
+
+    assert max(limits) <= 10
+
+def test_converges_down_when_latency_grows_with_concurrency():
+    limit: AdaptiveConcurrencyLimit = create_limit(initial_limit=32, probe_windows=20)
+    limits: list[int] = run_windows(limit, 300, lambda current_limit: 0.01 * current_limit)
+
+    assert max(limits[-100:]) <= 6
+
+def test_clamped_to_min_and_max():
+    limit: AdaptiveConcurrencyLimit = create_limit(min_limit=2, initial_limit=2, max_limit=6)
+    assert min(run_windows(limit, 50, lambda current_limit: 0.01 * current_limit ** 3)) >= 2
+
+    limit = create_limit(min_limit=2, initial_limit=2, max_limit=6)
+    limits: list[int] = run_windows(limit, 50, lambda _: 0.1)
+    assert max(limits) == 6
+    assert limits[-1] == 6
+
+def test_backs_off_on_high_cpu_utilization():
+    limit: AdaptiveConcurrencyLimit = create_limit(initial_limit=32, cpu_utilization_target=0.9)
+    limit._measure_cpu_utilization = lambda: 1.0
+    limits: list[int] = run_windows(limit, 5, lambda _: 0.1)
+
+    assert limits == sorted(limits, reverse=True)
+    assert limits[-1] < 32
+    assert limit.cpu_utilization == 1.0
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    DEADLINE: float = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > DEADLINE:
+            return False
+        time.sleep(0.01)
+
+    return True
+
+def running_workers(name: str) -> int:
+    return sum(1 for thread in threading.enumerate() if thread.name.startswith(f'rabbitmq_queue_handler:{name}:'))
+
+class ScriptedLimit(AdaptiveConcurrencyLimit):
+    '''
+        A limit that changes only when the test sets `next_limit`
+    '''
+    def __init__(self, initial_limit: int) -> None:
+        super().__init__(initial_limit=initial_limit)
+        self.next_limit: int = None
+
+    def on_sample(self, latency: float, in_flight: int) -> int | None:
+        with self._lock:
+            if self.next_limit is None:
+                return None
+
+            self.estimated_limit, self.next_limit = float(self.next_limit), None
+            return self.limit
+
+def test_pool_grows_and_shrinks_with_the_limit():
+    limit: ScriptedLimit = ScriptedLimit(initial_limit=2)
+    pool: AdaptiveHandlerPool = AdaptiveHandlerPool('grow_shrink', limit, prefetch_per_worker=3)
+    handled: list[int] = []
+    prefetches: list[int] = []
+    pool.start(handled.append, prefetches.append)
+
+    assert wait_for(lambda: running_workers('grow_shrink') == 2)
+    assert pool.prefetch_count == 6
+
+    limit.next_limit = 5
+    pool.submit(1)
+    assert wait_for(lambda: running_workers('grow_shrink') == 5)
+    assert prefetches == [15]
+
+    limit.next_limit = 1
+    for job in range(2, 12):
+        pool.submit(job)
+    assert wait_for(lambda: len(handled) == 11)
+    assert sorted(handled) == list(range(1, 12))
+    assert wait_for(lambda: running_workers('grow_shrink') == 1)
+    assert prefetches == [15, 3]
+
+    pool.stop()
+    assert wait_for(lambda: running_workers('grow_shrink') == 0)
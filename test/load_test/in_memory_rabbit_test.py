@@ -0,0 +1,81 @@
+from pika.spec import BasicProperties
+
+from load_test.in_memory_rabbit import InMemoryConnection, InMemoryChannel
+
+def run_ioloop(connection: InMemoryConnection) -> None:
+    """
+        Runs the callbacks scheduled so far (and those they schedule meanwhile), then returns
+    """
+    connection.ioloop.stop()
+    connection.ioloop.start()
+
+def open_channel(connection: InMemoryConnection) -> InMemoryChannel:
+    channel: InMemoryChannel = connection.channel()
+    channel.queue_declare(queue='jobs')
+    return channel
+
+def test_open_callback_runs_on_the_ioloop():
+    opened: list[InMemoryConnection] = []
+    connection: InMemoryConnection = InMemoryConnection(on_open_callback=opened.append)
+    assert opened == []
+
+    run_ioloop(connection)
+    assert opened == [connection]
+
+def test_deliver_and_ack():
+    connection: InMemoryConnection = InMemoryConnection()
+    channel: InMemoryChannel = open_channel(connection)
+    deliveries: list = []
+    channel.basic_consume('jobs', lambda *args: deliveries.append(args))
+
+    channel.basic_publish('', 'jobs', b'job', BasicProperties(headers={ 'id': 1 }))
+    channel.basic_publish('', 'missing-queue', b'dropped')
+    run_ioloop(connection)
+
+    assert len(deliveries) == 1
+    _, method, properties, body = deliveries[0]
+    assert (body, properties.headers, method.routing_key) == (b'job', { 'id': 1 }, 'jobs')
+    assert connection.unacked_count() == 1
+
+    channel.basic_ack(method.delivery_tag)
+    assert connection.unacked_count() == 0
+
+def test_prefetch_bounds_unacked_messages():
+    connection: InMemoryConnection = InMemoryConnection()
+    channel: InMemoryChannel = open_channel(connection)
+    deliveries: list = []
+    channel.basic_qos(prefetch_count=2)
+    channel.basic_consume('jobs', lambda *args: deliveries.append(args))
+
+    for index in range(5):
+        channel.basic_publish('', 'jobs', index)
+    run_ioloop(connection)
+    assert ([body for *_, body in deliveries], connection.queue_depth()) == ([0, 1], 3)
+
+    channel.basic_ack(deliveries[0][1].delivery_tag)
+    run_ioloop(connection)
+    assert [body for *_, body in deliveries] == [0, 1, 2]
+
+def test_nack_requeues_to_the_front():
+    connection: InMemoryConnection = InMemoryConnection()
+    channel: InMemoryChannel = open_channel(connection)
+    deliveries: list = []
+    channel.basic_qos(prefetch_count=1)
+    channel.basic_consume('jobs', lambda *args: deliveries.append(args))
+
+    channel.basic_publish('', 'jobs', 'first')
+    channel.basic_publish('', 'jobs', 'second')
+    run_ioloop(connection)
+    channel.basic_nack(deliveries[0][1].delivery_tag, requeue=True)
+    run_ioloop(connection)
+
+    assert [body for *_, body in deliveries] == ['first', 'first']
+
+def test_auto_ack_is_not_tracked():
+    connection: InMemoryConnection = InMemoryConnection()
+    channel: InMemoryChannel = open_channel(connection)
+    channel.basic_consume('jobs', lambda *args: None, auto_ack=True)
+    channel.basic_publish('', 'jobs', 'job')
+    run_ioloop(connection)
+
+    assert connection.unacked_count() == 0
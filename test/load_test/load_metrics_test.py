@@ -0,0 +1,46 @@
+import os
+import time
+
+import pytest
+
+from load_test.load_metrics import LoadMetrics, LoadReport, current_rss_bytes
+
+def test_report_percentiles_and_counts():
+    metrics: LoadMetrics = LoadMetrics()
+    metrics.started_at = 100.0
+    metrics.finished_at = 110.0
+    for index in range(100):
+        metrics.record_publish()
+        # Latencies of 1..100 ms, queue waits of half of them
+        metrics.record_ack(0.0, (index + 1) / 2000, (index + 1) / 1000, failed=index == 0)
+
+    report: LoadReport = metrics.report()
+    assert (report.published, report.acked, report.errors) == (100, 100, 1)
+    assert report.throughput == pytest.approx(10)
+    assert report.latency_ms['p50'] == pytest.approx(50.5)
+    assert report.latency_ms['max'] == pytest.approx(100)
+    assert report.queue_wait_ms['max'] == pytest.approx(50)
+
+def test_empty_report():
+    report: LoadReport = LoadMetrics().report()
+    assert report.latency_ms == {}
+    assert report.peak_ack_lag == 0
+
+def test_sampling():
+    metrics: LoadMetrics = LoadMetrics()
+    metrics.record_publish()
+    metrics.record_publish()
+    metrics.record_ack(time.time(), time.time(), time.time())
+
+    stop_sampling = metrics.start_sampling(0.01, lambda: 3, lambda: 1, lambda: 1024, lambda: 7)
+    time.sleep(0.1)
+    stop_sampling.set()
+
+    sample = metrics.samples[0]
+    assert (sample.queue_depth, sample.unacked, sample.ack_lag, sample.rss_bytes, sample.concurrency_limit) == (3, 1, 1, 1024, 7)
+    assert metrics.report().peak_rss_bytes == 1024
+
+def test_current_rss_bytes():
+    assert current_rss_bytes() > 0
+    if os.path.exists('/proc/self/statm'):
+        assert current_rss_bytes(os.getpid()) > 0
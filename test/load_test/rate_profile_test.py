@@ -0,0 +1,15 @@
+import pytest
+
+from load_test.rate_profile import RateProfile
+
+def test_constant_rate():
+    profile: RateProfile = RateProfile(10, 10, 60)
+    assert profile.rate_at(0) == 10
+    assert profile.rate_at(59) == 10
+
+def test_ramp_is_linear_and_holds_the_end_rate():
+    profile: RateProfile = RateProfile(10, 110, 100)
+    assert profile.rate_at(0) == 10
+    assert profile.rate_at(50) == pytest.approx(60)
+    assert profile.rate_at(100) == 110
+    assert profile.rate_at(200) == 110
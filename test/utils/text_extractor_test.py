@@ -1,2 +1,187 @@
+import os
+import stat
+from zipfile import ZipFile
+
 import pytest
+import lxml.etree as etree
+
+from load_test.synthetic_docx import generate_docx, style_id
+from utils.styles_cache import StylesCache, compile_styles, resolve_style_ids
+from utils.text_extractor import get_values_by_xpath, extract_strings_by_style
+
+W_NAMESPACE: str = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+def styles_xml(*styles: str) -> bytes:
+    return f'<w:styles xmlns:w="{W_NAMESPACE}">{"".join(styles)}</w:styles>'.encode()
+
+def style(style_id: str, name: str = None, link: str = None, based_on: str = None) -> str:
+    return (
+        f'<w:style w:type="paragraph" w:styleId="{style_id}">'
+        + (f'<w:name w:val="{name}"/>' if name else '')
+        + (f'<w:basedOn w:val="{based_on}"/>' if based_on else '')
+        + (f'<w:link w:val="{link}"/>' if link else '')
+        + '</w:style>'
+    )
+
+TEMPLATE_STYLES: bytes = styles_xml(
+    style('Heading1', 'heading 1', 'Heading1Char'),
+    style('Heading2', 'heading 2', 'Heading2Char'),
+    style('Quote', 'quote', 'QuoteChar'),
+    style('Normal', 'Normal')
+)
+
+def test_compile_styles_resolves_based_on_chain():
+    compiled: dict[str, list[str]] = compile_styles(styles_xml(
+        style('Heading1', 'heading 1', 'Heading1Char'),
+        style('Sub', 'sub heading', 'SubChar', based_on='Heading1'),
+        style('SubSub', 'sub sub heading', 'SubSubChar', based_on='Sub')
+    ))
+
+    assert compiled == {
+        'heading 1': ['Heading1Char', 'SubChar', 'SubSubChar'],
+        'sub heading': ['SubChar', 'SubSubChar'],
+        'sub sub heading': ['SubSubChar']
+    }
+
+def test_compile_styles_guards_cycles_and_missing_parts():
+    compiled: dict[str, list[str]] = compile_styles(styles_xml(
+        style('A', 'style a', 'AChar', based_on='B'),
+        style('B', 'style b', 'BChar', based_on='A'),
+        style('NoLink', 'no link'),
+        style('Orphan', 'orphan', 'OrphanChar', based_on='Missing'),
+        style('NoName', link='NoNameChar', based_on='A')
+    ))
+
+    assert compiled == {
+        'style a': ['AChar', 'BChar', 'NoNameChar'],
+        'style b': ['AChar', 'BChar', 'NoNameChar'],
+        'orphan': ['OrphanChar']
+    }
+
+@pytest.mark.parametrize('style_name', ['heading 1', 'heading', 'quote', 'Normal', 'missing'])
+def test_resolve_style_ids_matches_the_contains_xpath(style_name: str):
+    xpath_ids: list[str] = get_values_by_xpath(
+        TEMPLATE_STYLES, f".//*[contains(@w:val,'{style_name}')]/../w:link/@w:val"
+    ).hits
+
+    assert resolve_style_ids(compile_styles(TEMPLATE_STYLES), style_name) == list(xpath_ids)
+
+def test_styles_cache_stats(tmp_path):
+    cache: StylesCache = StylesCache(str(tmp_path))
+    cache.get(TEMPLATE_STYLES)
+    cache.get(TEMPLATE_STYLES)
+
+    other_process: StylesCache = StylesCache(str(tmp_path))
+    assert other_process.get(TEMPLATE_STYLES) == compile_styles(TEMPLATE_STYLES)
+
+    assert (cache.stats.hits, cache.stats.shared_hits, cache.stats.misses) == (1, 0, 1)
+    assert (other_process.stats.hits, other_process.stats.shared_hits, other_process.stats.misses) == (0, 1, 0)
+    assert cache.stats.hit_rate == 0.5
+
+def test_styles_cache_shared_entries_are_readable_by_other_users(tmp_path):
+    StylesCache(str(tmp_path)).get(TEMPLATE_STYLES)
+    (entry,) = os.listdir(tmp_path)
+
+    assert stat.S_IMODE(os.stat(os.path.join(tmp_path, entry)).st_mode) == 0o644
+
+def test_styles_cache_evicts_least_recently_used_shared_entry(tmp_path):
+    cache: StylesCache = StylesCache(str(tmp_path), max_entries=2, touch_interval=0)
+    hot_styles: bytes = styles_xml(style('Hot', 'hot', 'HotChar'))
+    cold_styles: bytes = styles_xml(style('Cold', 'cold', 'ColdChar'))
+    cache.get(hot_styles)
+    cache.get(cold_styles)
+
+    # The hot entry was written first, but it keeps being served from the process memory
+    for index, file_name in enumerate(sorted(os.listdir(tmp_path))):
+        os.utime(os.path.join(tmp_path, file_name), (index + 1, index + 1))
+    cache.get(hot_styles)
+    cache.get(styles_xml(style('New', 'new', 'NewChar')))
+
+    other_process: StylesCache = StylesCache(str(tmp_path))
+    other_process.get(hot_styles)
+    other_process.get(cold_styles)
+    assert (other_process.stats.shared_hits, other_process.stats.misses) == (1, 1)
+
+def test_styles_cache_falls_back_to_process_memory(tmp_path):
+    not_a_directory: str = os.path.join(tmp_path, 'file')
+    open(not_a_directory, 'w').close()
+
+    cache: StylesCache = StylesCache(os.path.join(not_a_directory, 'cache'))
+    cache.get(TEMPLATE_STYLES)
+    cache.get(TEMPLATE_STYLES)
+
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+def test_styles_cache_removes_temporary_file_on_failed_write(tmp_path, monkeypatch):
+    def failing_dump(*_args, **_kwargs):
+        raise ValueError('failed')
+    monkeypatch.setattr('utils.styles_cache.json.dump', failing_dump)
+
+    cache: StylesCache = StylesCache(str(tmp_path))
+    assert cache.get(TEMPLATE_STYLES) == compile_styles(TEMPLATE_STYLES)
+    assert os.listdir(tmp_path) == []
+
+def test_styles_cache_clear_removes_only_its_entries(tmp_path):
+    unrelated: str = os.path.join(tmp_path, 'unrelated.txt')
+    open(unrelated, 'w').close()
+
+    cache: StylesCache = StylesCache(str(tmp_path))
+    cache.get(TEMPLATE_STYLES)
+    open(os.path.join(tmp_path, 'leftover.tmp'), 'w').close()
+    cache.clear()
+
+    assert os.listdir(tmp_path) == ['unrelated.txt']
+    cache.get(TEMPLATE_STYLES)
+    assert cache.stats.misses == 2
+
+def test_get_values_by_xpath_parsed_root():
+    root: etree._Element = etree.fromstring(TEMPLATE_STYLES)
+
+    assert get_values_by_xpath(root, './/w:name/@w:val').hits == ['heading 1', 'heading 2', 'quote', 'Normal']
+    assert get_values_by_xpath(root, './/w:name/@w:val').tree is root
+
+def expected_hits(docx_path: str, styles_ids: dict[str, str]) -> dict[str, list[str]]:
+    """
+        Collects the decorated runs texts of each style name, by walking the document runs
+    """
+    W: str = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+    with ZipFile(docx_path) as archive:
+        root: etree._Element = etree.fromstring(archive.read('word/document.xml'))
+
+    expected: dict[str, list[str]] = {}
+    for run in root.iter(f'{W}r'):
+        run_style: etree._Element = run.find(f'{W}rPr/{W}rStyle')
+        for style_name, run_style_id in styles_ids.items():
+            if run_style is not None and run_style.get(f'{W}val') == run_style_id:
+                expected.setdefault(style_name, []).append(f'[{run.find(f"{W}t").text}:{run_style_id}]')
+
+    return expected
+
+def test_extract_strings_by_style_uses_the_styles_cache(tmp_path, monkeypatch):
+    STYLES_NAMES: list[str] = ['heading 1', 'heading 2', 'quote']
+    cache: StylesCache = StylesCache(os.path.join(tmp_path, 'cache'))
+    monkeypatch.setattr('utils.text_extractor.styles_cache', cache)
+
+    for seed in range(3):
+        docx_path: str = os.path.join(tmp_path, f'{seed}.docx')
+        with open(docx_path, 'wb') as docx_file:
+            docx_file.write(generate_docx(STYLES_NAMES, paragraphs=30, words_per_paragraph=5, seed=seed))
+
+        results: dict[str, list[etree._Element]] = extract_strings_by_style(docx_path, STYLES_NAMES)
+        hits: dict[str, list[str]] = { name: [element.text for element in elements] for name, elements in results.items() }
+
+        assert hits == expected_hits(docx_path, { name: style_id(name) for name in STYLES_NAMES })
+        assert len(hits) == len(STYLES_NAMES)
+
+    assert (cache.stats.misses, cache.stats.shared_hits, cache.stats.hits) == (1, 0, 2)
+
+def test_extract_strings_by_style_collects_every_matching_style_id(tmp_path, monkeypatch):
+    monkeypatch.setattr('utils.text_extractor.styles_cache', StylesCache(os.path.join(tmp_path, 'cache')))
+    docx_path: str = os.path.join(tmp_path, 'doc.docx')
+    with open(docx_path, 'wb') as docx_file:
+        docx_file.write(generate_docx(['heading 1', 'heading 2'], paragraphs=30, words_per_paragraph=3, seed=1))
+
+    hits: list[str] = [element.text for element in extract_strings_by_style(docx_path, ['heading'])['heading']]
+    expected: dict[str, list[str]] = expected_hits(docx_path, { 'heading 1': 'Heading1Char', 'heading 2': 'Heading2Char' })
 
+    assert hits == expected['heading 1'] + expected['heading 2']
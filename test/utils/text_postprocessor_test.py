@@ -0,0 +1,99 @@
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import lxml.etree as etree
+
+from constants.text_postprocessor_constants import Columns, ParquetFiles
+from utils.text_postprocessor import (
+    build_text_batch, normalize_whitespace, drop_empty_texts,
+    deduplicate, count_frequencies, write_parquet, postprocess_extractions
+)
+
+def texts(table: pa.Table) -> list[str]:
+    return table.column(Columns.TEXT).to_pylist()
+
+def test_build_text_batch_columns():
+    table: pa.Table = build_text_batch({
+        'doc1': { 'heading': ['a', 'b'], 'quote': ['c'] },
+        'doc2': { 'heading': ['d'], 'quote': [] }
+    })
+
+    assert table.column(Columns.DOCUMENT).to_pylist() == ['doc1', 'doc1', 'doc1', 'doc2']
+    assert table.column(Columns.STYLE).to_pylist() == ['heading', 'heading', 'quote', 'heading']
+    assert pa.types.is_dictionary(table.schema.field(Columns.STYLE).type)
+    assert texts(table) == ['a', 'b', 'c', 'd']
+
+def test_build_text_batch_strips_extractor_decoration():
+    element: etree._Element = etree.Element('t')
+    element.text = '[some: text:Heading1Char]'
+    undecorated: etree._Element = etree.Element('t')
+    undecorated.text = 'plain'
+    multiline: etree._Element = etree.Element('t')
+    multiline.text = '[two\nlines:Heading1Char]'
+
+    assert texts(build_text_batch({ 'doc': { 'heading': [element, undecorated, multiline] } })) == [
+        'some: text', 'plain', 'two\nlines'
+    ]
+
+def test_normalize_whitespace_unicode_separators():
+    table: pa.Table = build_text_batch({ 'doc': { 'heading': [
+        'a\xa0\xa0b', 'a b', 'a\x0bb', ' a \t\n b ', '\xa0  '
+    ] } })
+
+    assert texts(normalize_whitespace(table)) == ['a b', 'a b', 'a b', 'a b', '']
+
+def test_drop_empty_texts():
+    table: pa.Table = normalize_whitespace(build_text_batch({ 'doc': { 'heading': ['a', '  ', ''] } }))
+    assert texts(drop_empty_texts(table)) == ['a']
+
+def test_deduplicate_keeps_first_occurrence_per_document_and_style():
+    table: pa.Table = build_text_batch({
+        'doc1': { 'heading': ['b', 'a', 'b'], 'quote': ['a'] },
+        'doc2': { 'heading': ['a'] }
+    })
+    deduplicated: pa.Table = deduplicate(table)
+
+    assert texts(deduplicated) == ['b', 'a', 'a', 'a']
+    assert deduplicated.column(Columns.STYLE).to_pylist() == ['heading', 'heading', 'quote', 'heading']
+    assert deduplicate(build_text_batch({})).num_rows == 0
+
+def test_count_frequencies():
+    table: pa.Table = build_text_batch({
+        'doc1': { 'heading': ['a', 'b'], 'quote': ['a'] },
+        'doc2': { 'heading': ['a'] }
+    })
+
+    assert count_frequencies(table).to_pylist() == [
+        { Columns.STYLE: 'heading', Columns.TEXT: 'a', Columns.COUNT: 2 },
+        { Columns.STYLE: 'heading', Columns.TEXT: 'b', Columns.COUNT: 1 },
+        { Columns.STYLE: 'quote', Columns.TEXT: 'a', Columns.COUNT: 1 }
+    ]
+    assert count_frequencies(build_text_batch({})).num_rows == 0
+
+def test_count_frequencies_concatenated_batches():
+    table: pa.Table = pa.concat_tables([
+        build_text_batch({ 'doc1': { 'heading': ['a'] } }),
+        build_text_batch({ 'doc2': { 'quote': ['b'], 'heading': ['a'] } })
+    ])
+
+    assert { (row[Columns.STYLE], row[Columns.TEXT]): row[Columns.COUNT] for row in count_frequencies(table).to_pylist() } == {
+        ('heading', 'a'): 2, ('quote', 'b'): 1
+    }
+
+def test_write_parquet_round_trip(tmp_path):
+    table: pa.Table = build_text_batch({ 'doc': { 'heading': ['a', 'b'] } })
+    path: str = os.path.join(tmp_path, 'runs.parquet')
+    write_parquet(table, path)
+
+    assert pq.read_table(path).equals(table)
+
+def test_postprocess_extractions(tmp_path):
+    result = postprocess_extractions({
+        'doc1': { 'heading': ['a  b', 'a\xa0b', '   '] },
+        'doc2': { 'heading': ['a b'] }
+    }, output_dir=str(tmp_path))
+
+    assert texts(result.runs) == ['a b', 'a b']
+    assert result.frequencies.to_pylist() == [{ Columns.STYLE: 'heading', Columns.TEXT: 'a b', Columns.COUNT: 2 }]
+    assert pq.read_table(os.path.join(tmp_path, ParquetFiles.FREQUENCIES)).equals(result.frequencies)